@@ -1,11 +1,18 @@
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
-from pymmich.user import get_user
+from pymmich.batch import run_in_batches, BATCH_FAILED, DEFAULT_BATCH_SIZE, DEFAULT_BATCH_WORKERS, \
+    DEFAULT_BATCH_RETRIES
+from pymmich.cache import cached, invalidates
+from pymmich.instrumentation import log_payload
+from pymmich.models import Album, loads, to_model
+from pymmich.user import get_users
 
 
+@cached("album")
 def get_album(self, album_id=None) -> object:
     logging.debug(f"### Get album with id : {album_id}")
 
@@ -15,11 +22,12 @@ def get_album(self, album_id=None) -> object:
 
     url = f"{self.base_url}/api/albums/{album_id}"
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response album : {response.json()}")
-        return response.json()
+        album = loads(response.content)
+        log_payload(self, "### Response album : %s", album)
+        return to_model(self, Album, album)
     else:
         logging.error(f'Failed to retrieve album {album_id} with status code {response.status_code}')
         logging.error(response.text)
@@ -28,20 +36,75 @@ def get_album(self, album_id=None) -> object:
 
 def get_album_by_name(self, target_album_name, albums=None) -> object:
     logging.debug(f"### Get album by name : {target_album_name}")
-    if not albums:
-        curr_album = get_albums(self)
-    else:
-        curr_album = albums
+    if albums:
+        for album in albums:
+            if album.get('albumName') == target_album_name:
+                log_payload(self, "### Returned album : %s", album)
+                return album
+
+        logging.debug(f"### Returned album : None")
+        return None
+
+    album = get_albums_by_names(self, [target_album_name]).get(target_album_name)
+    log_payload(self, "### Returned album : %s", album)
+    return album
+
+
+def get_albums_by_names(self, target_albums_names) -> dict:
+    logging.debug(f"### Get albums by names : {target_albums_names}")
+
+    index = self.album_index
+    refreshed = index.stale and refresh_album_index(self)
+
+    albums = {album_name: index.get_by_name(album_name) for album_name in target_albums_names}
+
+    # Albums created by other clients since the last refresh are picked up by a single incremental refresh, the names
+    # still missing after it are known to be missing and do not trigger any refresh until the index is refreshed again
+    if not refreshed and any(album is None and album_name not in index.missing_names
+                             for album_name, album in albums.items()):
+        refreshed = refresh_album_index(self)
+        albums = {album_name: index.get_by_name(album_name) for album_name in target_albums_names}
+
+    if refreshed:
+        index.mark_missing(album_name for album_name, album in albums.items() if album is None)
+    return albums
+
+
+def get_albums_by_asset(self, asset_id) -> list:
+    logging.debug(f"### Get indexed albums with asset_id : {asset_id}")
+
+    # GET /api/albums lists the albums without their assets, which are fetched per album for the index by asset
+    if self.album_index.stale or not self.album_index.has_assets:
+        refresh_album_index(self, with_assets=True)
+
+    return self.album_index.get_by_asset(asset_id)
+
+
+def refresh_album_index(self, with_assets: bool = False) -> bool:
+    logging.debug(f"### Refresh album index with with_assets : {with_assets}")
+
+    albums = get_albums(self)
+    if albums is None:
+        return False
+
+    if with_assets:
+        # Only the albums changed since the last refresh are fetched again with their assets
+        index = self.album_index
+        albums = [album if not _needs_assets(index.get_by_id(album['id']), album) else
+                  get_album(self, album['id']) or album for album in albums]
+
+    self.album_index.update(albums)
+    return True
 
-    for album in curr_album:
-        if album.get('albumName') == target_album_name:
-            logging.debug(f"### Returned album : {album}")
-            return album
 
-    logging.debug(f"### Returned album : None")
-    return None
+def _needs_assets(indexed_album, album) -> bool:
+    if album.get('assets') or not album.get('assetCount'):
+        return False
+    return indexed_album is None or indexed_album.get('updatedAt') != album.get('updatedAt') or \
+        not indexed_album.get('assets')
 
 
+@cached("albums")
 def get_albums(self, asset_id=None, shared_album=None) -> object:
     logging.debug(f"### Get albums with asset_id : {asset_id} and shared_album : {shared_album}")
 
@@ -58,11 +121,12 @@ def get_albums(self, asset_id=None, shared_album=None) -> object:
     elif asset_id is not None and shared_album is False:
         url = f"{self.base_url}/api/albums?assetId={asset_id}&shared=false"
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response albums : {response.json()}")
-        return response.json()
+        albums = loads(response.content)
+        log_payload(self, "### Response albums : %s", albums)
+        return to_model(self, Album, albums)
     else:
         logging.error(f'Failed to retrieve albums with asset_id : {asset_id} and shared_album : {shared_album}'
                       f' with status code {response.status_code}')
@@ -70,10 +134,32 @@ def get_albums(self, asset_id=None, shared_album=None) -> object:
         return None
 
 
+@invalidates("albums", album_index=False)
 def create_album(self, album_name, owners_id) -> bool:
-    logging.debug("### Album creation name '" + album_name + "' for users " + str(
-        [get_user(self, user_id).get('name') for user_id in owners_id if get_user(self, user_id)]))
+    # Owner names are only resolved when the debug message is actually emitted
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        users = get_users(self, owners_id)
+        logging.debug("### Album creation name '" + album_name + "' for users " + str(
+            [users[user_id].get('name') for user_id in owners_id if users.get(user_id)]))
+
+    return _post_album(self, album_name, owners_id)
+
+
+@invalidates("albums", album_index=False)
+def create_albums(self, albums, max_workers=DEFAULT_BATCH_WORKERS) -> dict:
+    albums = dict(albums)
+
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        users = get_users(self, [user_id for owners_id in albums.values() for user_id in owners_id])
+        logging.debug("### Albums creation names " + str(list(albums)) + " for users " + str(
+            [user.get('name') for user in users.values() if user]))
 
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-album') as executor:
+        results = executor.map(lambda album: _post_album(self, *album), albums.items())
+        return dict(zip(albums, results))
+
+
+def _post_album(self, album_name, owners_id) -> bool:
     url = f'{self.base_url}/api/albums'
 
     # Creates a list of dictionaries for albumUsers
@@ -88,10 +174,21 @@ def create_album(self, album_name, owners_id) -> bool:
     # Converts payload to JSON
     payload = json.dumps(payload)
 
-    response = requests.post(url, data=payload, **self.requests_kwargs, verify=True)
+    try:
+        response = self.session.post(url, data=payload, **self.requests_kwargs, verify=True)
+    except requests.RequestException:
+        # The album may have been created all the same, the next lookups refresh the index
+        self.album_index.invalidate()
+        raise
 
     if response.status_code in (200, 201):
         logging.debug('Album creation successful')
+        # The created album is indexed right away, so that the next lookups by name find it without any refresh
+        album = loads(response.content) if response.content else None
+        if album is not None and album.get('id') is not None:
+            self.album_index.add(to_model(self, Album, album))
+        else:
+            self.album_index.invalidate()
         return True
     else:
         logging.error(f'Album {album_name} creation failed with status code {response.status_code}')
@@ -99,6 +196,7 @@ def create_album(self, album_name, owners_id) -> bool:
         return False
 
 
+@invalidates("album", "albums")
 def delete_album(self, album_id) -> bool:
     logging.debug(f"### Delete album with album_id : {album_id}")
 
@@ -110,7 +208,7 @@ def delete_album(self, album_id) -> bool:
     # Converts payload to JSON
     payload = json.dumps(payload)
 
-    response = requests.delete(url, data=payload, **self.requests_kwargs, verify=True)
+    response = self.session.delete(url, data=payload, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
         logging.debug(f"### Delete album done")
@@ -121,25 +219,41 @@ def delete_album(self, album_id) -> bool:
         return False
 
 
-def add_assets_to_album(self, album_id, assets_ids) -> bool:
-    logging.debug("### Add in album " + album_id + " : " + str(len(assets_ids)) + " assets")
+def add_assets_to_album(self, album_id, assets_ids, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                        retries=DEFAULT_BATCH_RETRIES) -> bool:
+    results = bulk_add_assets_to_album(self, album_id, assets_ids, batch_size, max_workers, retries)
+    return all(result["error"] != BATCH_FAILED for result in results.values())
 
-    url = f'{self.base_url}/api/albums/{album_id}/assets'
-
-    # Creates JSON payload with data
-    payload = {
-        "ids": list(assets_ids)
-    }
 
-    # Converts payload to JSON
-    payload = json.dumps(payload)
+@invalidates("album", "albums")
+def bulk_add_assets_to_album(self, album_id, assets_ids, batch_size=DEFAULT_BATCH_SIZE,
+                             max_workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_BATCH_RETRIES) -> dict:
+    assets_ids = list(assets_ids)
+    logging.debug("### Add in album " + album_id + " : " + str(len(assets_ids)) + " assets in batches of " +
+                  str(batch_size))
 
-    response = requests.put(url, data=payload, **self.requests_kwargs, verify=True)
+    url = f'{self.base_url}/api/albums/{album_id}/assets'
 
-    if response.status_code in (200, 201):
-        logging.debug('Add assets to album successful')
-        return True
-    else:
-        logging.error(f'Add assets to album {album_id} failed with status code {response.status_code}')
-        logging.error(response.text)
-        return False
+    def send_batch(batch):
+        # Creates JSON payload with data
+        payload = {
+            "ids": batch
+        }
+
+        # Converts payload to JSON
+        payload = json.dumps(payload)
+
+        response = self.session.put(url, data=payload, **self.requests_kwargs, verify=True)
+
+        if response.status_code in (200, 201):
+            # Ids already in the album or not accessible are reported one by one by the server
+            return {item['id']: item.get('error') for item in loads(response.content) if not item.get('success')}
+        else:
+            logging.error(f'Add {len(batch)} assets to album {album_id} failed with status code '
+                          f'{response.status_code}')
+            logging.error(response.text)
+            return None
+
+    results = run_in_batches(assets_ids, send_batch, batch_size, max_workers, retries)
+    logging.debug('Add assets to album done')
+    return results
@@ -0,0 +1,97 @@
+import threading
+
+
+class AlbumIndex:
+    """
+    In-memory index of the albums by name, by id and by asset, built from the albums list
+
+    The lookups return the indexed albums themselves, they must not be modified by the callers.
+    """
+
+    def __init__(self) -> None:
+        self.by_id = {}
+        self.by_name = {}
+        self.by_asset = {}
+        self.stale = True
+        # Whether every non-empty album is indexed with its assets, so that the index by asset is complete
+        self.has_assets = False
+        # Names found in none of the albums since the last refresh, they are not looked up again until the next one
+        self.missing_names = set()
+        self._lock = threading.Lock()
+
+    def update(self, albums) -> None:
+        """
+        Applies a fresh albums list, only the albums whose updatedAt changed are re-indexed
+
+        :param albums: the albums as returned by get_albums, or by get_album for the assets of each album
+        """
+        with self._lock:
+            albums_ids = {}
+            for album in albums:
+                albums_ids[album['id']] = None
+                indexed_album = self.by_id.get(album['id'])
+                if indexed_album is None or indexed_album.get('updatedAt') != album.get('updatedAt') \
+                        or (album.get('assets') and not indexed_album.get('assets')):
+                    self._remove_assets(indexed_album)
+                    self._add(album)
+
+            for album_id in self.by_id.keys() - albums_ids.keys():
+                self._remove_assets(self.by_id.pop(album_id))
+
+            # Keeps the order of the albums list
+            self.by_id = {album_id: self.by_id[album_id] for album_id in albums_ids}
+
+            # The first album of a name wins, as with a linear scan of the albums list
+            self.by_name = {}
+            for album in self.by_id.values():
+                self.by_name.setdefault(album.get('albumName'), album)
+
+            self.has_assets = all(album.get('assets') or not album.get('assetCount') for album in self.by_id.values())
+            self.missing_names = set()
+            self.stale = False
+
+    def add(self, album) -> None:
+        """
+        Indexes a single album, such as an album just created, without refreshing the whole index
+
+        :param album: the album as returned by the server
+        """
+        with self._lock:
+            self._remove_assets(self.by_id.get(album['id']))
+            self._add(album)
+            self.by_name.setdefault(album.get('albumName'), album)
+            self.missing_names.discard(album.get('albumName'))
+            if album.get('assetCount') and not album.get('assets'):
+                self.has_assets = False
+
+    def mark_missing(self, albums_names) -> None:
+        with self._lock:
+            self.missing_names.update(albums_names)
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    def get_by_name(self, album_name) -> object:
+        return self.by_name.get(album_name)
+
+    def get_by_id(self, album_id) -> object:
+        return self.by_id.get(album_id)
+
+    def get_by_asset(self, asset_id) -> list:
+        with self._lock:
+            return [self.by_id[album_id] for album_id in self.by_asset.get(asset_id, ())]
+
+    def _add(self, album) -> None:
+        self.by_id[album['id']] = album
+        for asset in album.get('assets') or []:
+            self.by_asset.setdefault(asset['id'], set()).add(album['id'])
+
+    def _remove_assets(self, album) -> None:
+        if album is None:
+            return
+        for asset in album.get('assets') or []:
+            albums_ids = self.by_asset.get(asset['id'])
+            if albums_ids is not None:
+                albums_ids.discard(album['id'])
+                if not albums_ids:
+                    del self.by_asset[asset['id']]
@@ -1,12 +1,86 @@
+import asyncio
+import base64
+import hashlib
 import json
 import logging
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timezone
-from io import BytesIO
+from tempfile import SpooledTemporaryFile
 
 import requests
 from PIL import Image, UnidentifiedImageError
 
+from pymmich.batch import run_in_batches, BATCH_FAILED, DEFAULT_BATCH_SIZE, DEFAULT_BATCH_WORKERS, \
+    DEFAULT_BATCH_RETRIES
+from pymmich.cache import invalidates
 from pymmich.enums.asset_job import AssetJob
+from pymmich.instrumentation import log_payload
+from pymmich.models import Asset, loads, to_model
+from pymmich.multipart import MultipartBody
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+UPLOAD_DEVICE_ID = "pymmich"
+UPLOAD_CHECK_BATCH_SIZE = 1000
+ASSETS_INFO_WORKERS = 8
+
+
+class FullSyncError(Exception):
+    """Raised by the full sync iterators when a page cannot be retrieved, instead of ending the stream early"""
+
+    def __init__(self, user_id, last_asset_id) -> None:
+        super().__init__(f"Failed to retrieve the full sync page of user {user_id} after asset {last_asset_id}")
+        self.user_id = user_id
+        self.last_asset_id = last_asset_id
+
+
+class LazyImage:
+    """
+    PIL image whose pixels are only decoded on demand, returned by download_asset with lazy=True
+
+    The handle owns the downloaded file and closes it once the pixels are loaded, or once the handle is closed, also
+    when used as a context manager. The other attributes are the ones of the PIL image.
+    """
+
+    def __init__(self, image, image_file) -> None:
+        """
+        Constructor
+
+        :param image: the PIL image opened over the downloaded file, not loaded yet
+        :param image_file: the downloaded file, closed along with the handle
+        """
+        self.image = image
+        self._image_file = image_file
+
+    def load(self) -> object:
+        """
+        Decodes the pixels and closes the downloaded file
+
+        :return: the loaded PIL image
+        """
+        try:
+            self.image.load()
+        finally:
+            self._image_file.close()
+        return self.image
+
+    def close(self) -> None:
+        try:
+            self.image.close()
+        finally:
+            self._image_file.close()
+
+    def __getattr__(self, name):
+        return getattr(self.image, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
 
 
 def get_all_user_assets_by_device_id(self, device_id) -> object:
@@ -14,11 +88,12 @@ def get_all_user_assets_by_device_id(self, device_id) -> object:
 
     url = f"{self.base_url}/api/assets/device/{device_id}"
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response all user assets : {response.json()}")
-        return response.json()
+        assets_ids = loads(response.content)
+        log_payload(self, "### Response all user assets : %s", assets_ids)
+        return assets_ids
     else:
         logging.error(f'Failed to retrieve all user assets with device_id : {device_id} '
                       f'with status code {response.status_code}')
@@ -32,6 +107,104 @@ def get_full_sync_for_user(self, user_id, last_asset_id=None, updated_until=None
                   f"updated_until : {updated_until}, updated_after : {updated_after}, limit : {limit} and "
                   f"is_external : {is_external}")
 
+    updated_until, updated_after = _check_full_sync_dates(updated_until, updated_after)
+
+    response_data = _get_full_sync_page(self, user_id, last_asset_id, updated_until, limit)
+
+    if response_data is not None:
+        return to_model(self, Asset, _filter_full_sync_page(response_data, updated_after, is_external))
+
+
+def iter_full_sync(self, user_id, updated_until=None, updated_after=None, limit=1000, is_external: bool = False,
+                   use_delta_sync: bool = True):
+    logging.debug(f"### Iterate full sync for user with user_id : {user_id}, updated_until : {updated_until}, "
+                  f"updated_after : {updated_after}, limit : {limit}, is_external : {is_external} and "
+                  f"use_delta_sync : {use_delta_sync}")
+
+    # The upper bound is frozen so that every page is taken from the same snapshot
+    updated_until, updated_after = _check_full_sync_dates(updated_until, updated_after)
+
+    if updated_after is not None and use_delta_sync:
+        assets = _get_delta_sync_assets(self, user_id, updated_until, updated_after)
+        if assets is not None:
+            yield from to_model(self, Asset, _filter_full_sync_page(assets, None, is_external))
+            return
+
+    # A dedicated worker fetches the next page while the caller processes the current one
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='pymmich-full-sync') as prefetcher:
+        page = _get_full_sync_page_or_raise(self, user_id, None, updated_until, limit)
+        while page:
+            next_page = None
+            if len(page) >= limit:
+                next_page = prefetcher.submit(_get_full_sync_page_or_raise, self, user_id, page[-1]['id'],
+                                              updated_until, limit)
+            try:
+                yield from to_model(self, Asset, _filter_full_sync_page(page, updated_after, is_external))
+            except GeneratorExit:
+                if next_page is not None:
+                    next_page.cancel()
+                raise
+            page = next_page.result() if next_page is not None else None
+
+
+async def iter_full_sync_async(self, user_id, updated_until=None, updated_after=None, limit=1000,
+                               is_external: bool = False, use_delta_sync: bool = True):
+    logging.debug(f"### Iterate full sync asynchronously for user with user_id : {user_id}, updated_until : "
+                  f"{updated_until}, updated_after : {updated_after}, limit : {limit}, is_external : {is_external} "
+                  f"and use_delta_sync : {use_delta_sync}")
+
+    updated_until, updated_after = _check_full_sync_dates(updated_until, updated_after)
+
+    if updated_after is not None and use_delta_sync:
+        assets = await self.run_in_executor(_get_delta_sync_assets, self, user_id, updated_until, updated_after)
+        if assets is not None:
+            for item in to_model(self, Asset, _filter_full_sync_page(assets, None, is_external)):
+                yield item
+            return
+
+    page = await self.run_in_executor(_get_full_sync_page_or_raise, self, user_id, None, updated_until, limit)
+    while page:
+        next_page = None
+        if len(page) >= limit:
+            next_page = asyncio.ensure_future(self.run_in_executor(_get_full_sync_page_or_raise, self, user_id,
+                                                                   page[-1]['id'], updated_until, limit))
+        try:
+            for item in to_model(self, Asset, _filter_full_sync_page(page, updated_after, is_external)):
+                yield item
+        except BaseException:
+            if next_page is not None:
+                next_page.cancel()
+            raise
+        page = await next_page if next_page is not None else None
+
+
+def get_delta_sync(self, users_ids, updated_after) -> object:
+    logging.debug(f"### Get delta sync for users with users_ids : {users_ids} and updated_after : {updated_after}")
+
+    _, updated_after = _check_full_sync_dates(None, updated_after)
+
+    url = f'{self.base_url}/api/sync/delta-sync'
+
+    # Creates JSON payload with data
+    payload = {
+        "updatedAfter": updated_after.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        "userIds": list(users_ids)
+    }
+
+    # Converts payload to JSON
+    payload = json.dumps(payload)
+
+    response = self.session.post(url, data=payload, **self.requests_kwargs, verify=True)
+
+    if response.status_code == 200:
+        return loads(response.content)
+    else:
+        logging.error(f'Failed to retrieve delta sync for users {users_ids} with status code {response.status_code}')
+        logging.error(response.text)
+        return None
+
+
+def _check_full_sync_dates(updated_until, updated_after):
     if not updated_until:
         updated_until = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
 
@@ -48,6 +221,10 @@ def get_full_sync_for_user(self, user_id, last_asset_id=None, updated_until=None
         else:
             updated_after = updated_after.replace(tzinfo=timezone.utc)
 
+    return updated_until, updated_after
+
+
+def _get_full_sync_page(self, user_id, last_asset_id, updated_until, limit) -> object:
     url = f'{self.base_url}/api/sync/full-sync'
 
     # Creates JSON payload with data
@@ -64,21 +241,44 @@ def get_full_sync_for_user(self, user_id, last_asset_id=None, updated_until=None
     # Converts payload to JSON
     payload = json.dumps(payload)
 
-    response = requests.post(url, data=payload, **self.requests_kwargs, verify=True)
+    response = self.session.post(url, data=payload, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        response_data = response.json()
-        if updated_after is not None:
-            response_data = [item for item in response_data if
-                             datetime.strptime(item['updatedAt'], '%Y-%m-%dT%H:%M:%S.%fZ').replace(
-                                 tzinfo=timezone.utc) >= updated_after]
-        if is_external:
-            response_data = [item for item in response_data if item['originalPath'].startswith('/usr/src/app/external')]
-
-        return response_data
+        return loads(response.content)
     else:
-        logging.error(f'Failed with status code {response.status_code}')
+        logging.error(f'Failed to retrieve full sync page for user {user_id} after asset {last_asset_id} '
+                      f'with status code {response.status_code}')
         logging.error(response.text)
+        return None
+
+
+def _get_full_sync_page_or_raise(self, user_id, last_asset_id, updated_until, limit) -> list:
+    page = _get_full_sync_page(self, user_id, last_asset_id, updated_until, limit)
+    if page is None:
+        raise FullSyncError(user_id, last_asset_id)
+    return page
+
+
+def _get_delta_sync_assets(self, user_id, updated_until, updated_after) -> object:
+    delta = get_delta_sync(self, [user_id], updated_after)
+
+    # The server asks for a full sync when too many assets changed or when the delta window is no longer available
+    if delta is None or delta.get('needsFullSync'):
+        logging.debug(f"### Delta sync unavailable for user {user_id}, falling back to the full sync")
+        return None
+
+    updated_until = datetime.fromisoformat(updated_until)
+    return [item for item in delta.get('upserted', []) if datetime.fromisoformat(item['updatedAt']) <= updated_until]
+
+
+def _filter_full_sync_page(response_data, updated_after, is_external) -> list:
+    if updated_after is not None:
+        response_data = [item for item in response_data if
+                         datetime.fromisoformat(item['updatedAt']) >= updated_after]
+    if is_external:
+        response_data = [item for item in response_data if item['originalPath'].startswith('/usr/src/app/external')]
+
+    return response_data
 
 
 def get_random(self, count=1) -> object:
@@ -86,11 +286,12 @@ def get_random(self, count=1) -> object:
 
     url = f"{self.base_url}/api/assets/random?count={count}"
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response random asset : {response.json()}")
-        return response.json()
+        assets = loads(response.content)
+        log_payload(self, "### Response random asset : %s", assets)
+        return to_model(self, Asset, assets)
     else:
         logging.error(f'Failed to retrieve random asset with status code {response.status_code}')
         logging.error(response.text)
@@ -102,68 +303,503 @@ def get_asset_info(self, asset_id) -> object:
 
     url = f"{self.base_url}/api/assets/{asset_id}"
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response asset info status : {response.json()}")
-        return response.json()
+        asset = loads(response.content)
+        log_payload(self, "### Response asset info status : %s", asset)
+        return to_model(self, Asset, asset)
     else:
         logging.error(f'Failed to retrieve asset {asset_id} info status with status code {response.status_code}')
         logging.error(response.text)
         return None
 
 
-def download_asset(self, asset_id) -> object:
-    logging.debug(f"### Download File with asset_id : {asset_id}")
+def get_assets_info(self, assets_ids, max_workers=ASSETS_INFO_WORKERS) -> dict:
+    return dict(iter_assets_info(self, assets_ids, max_workers))
+
+
+def iter_assets_info(self, assets_ids, max_workers=ASSETS_INFO_WORKERS):
+    logging.debug(f"### Iterate assets info with max_workers : {max_workers}")
+
+    seen_ids = set()
+
+    # Only a bounded window of ids is scheduled so that a long id stream is never materialized
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-asset-info') as executor:
+        pending = {}
+        assets_ids = iter(assets_ids)
+        while True:
+            for asset_id in assets_ids:
+                if asset_id in seen_ids:
+                    continue
+                seen_ids.add(asset_id)
+                pending[executor.submit(_get_shared_asset_info, self, asset_id)] = asset_id
+                if len(pending) >= max_workers * 2:
+                    break
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+
+    logging.debug(f"### Iterate assets info done : {len(seen_ids)} assets")
+
+
+async def iter_assets_info_async(self, assets_ids, max_workers=ASSETS_INFO_WORKERS):
+    logging.debug(f"### Iterate assets info asynchronously with max_workers : {max_workers}")
+
+    seen_ids = set()
+    pending = {}
+    assets_ids = iter(assets_ids)
+    while True:
+        for asset_id in assets_ids:
+            if asset_id in seen_ids:
+                continue
+            seen_ids.add(asset_id)
+            pending[asyncio.ensure_future(self.run_in_executor(_get_shared_asset_info, self, asset_id))] = asset_id
+            if len(pending) >= max_workers:
+                break
+        if not pending:
+            break
+
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield pending.pop(task), task.result()
+
+
+def _get_shared_asset_info(self, asset_id) -> object:
+    # Concurrent lookups of the same asset, from this call or any other, share a single request
+    try:
+        return self.asset_info_flights.do(asset_id, get_asset_info, self, asset_id)
+    except requests.RequestException as exception:
+        # A connection reset or a timeout only fails its own asset, reported as None like any failed request
+        logging.error(f'Failed to get the info of asset {asset_id} : {exception}')
+        return None
+
+
+def download_asset(self, asset_id, lazy: bool = False, draft_size=None) -> object:
+    logging.debug(f"### Download File with asset_id : {asset_id}, lazy : {lazy} and draft_size : {draft_size}")
 
     url = f'{self.base_url}/api/assets/{asset_id}/original'
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    # The body is only read once the content type is known to be an image
+    with self.session.get(url, **self.requests_kwargs, verify=True, stream=True) as response:
+        if response.status_code != 200 or 'image/' not in response.headers.get('Content-Type', ''):
+            logging.error(f'Failed Downloading File {asset_id} with status code {response.status_code}')
+            return False
 
-    if response.status_code == 200 and 'image/' in response.headers.get('Content-Type', ''):
+        # Small images stay in memory, large ones are spooled to a temporary file instead of a single bytes object
+        image_file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            _write_response(response, image_file, DOWNLOAD_CHUNK_SIZE)
+        except BaseException:
+            image_file.close()
+            raise
         logging.debug(f"### Download File done")
-        image_bytes = BytesIO(response.content)
+        image_file.seek(0)
+
+    try:
+        # Only the headers are parsed here, size, format and EXIF are available without decoding any pixel
+        image = Image.open(image_file)
+    except UnidentifiedImageError:
+        logging.error(f"Failed to identify image for asset_id {asset_id}. "
+                      f"Content-Type: {response.headers.get('Content-Type')}")
+        image_file.close()
+        return False
+
+    try:
+        if draft_size is not None:
+            # JPEG images are decoded at the smallest scale still larger than draft_size
+            image.draft(None, draft_size)
+
+        if lazy:
+            # The spooled file stays open until the pixels are loaded on demand, the handle closes it
+            return LazyImage(image, image_file)
+
+        image.load()  # Force loading the image data while the file is open
+    except BaseException:
+        image_file.close()
+        raise
+    image_file.close()
+    return image
+
+
+def save_asset(self, asset_id, destination, chunk_size=DOWNLOAD_CHUNK_SIZE, verify_checksum: bool = False,
+               checksum=None, resume: bool = False) -> bool:
+    logging.debug(f"### Save asset with asset_id : {asset_id} to destination : {destination}, chunk_size : "
+                  f"{chunk_size}, verify_checksum : {verify_checksum} and resume : {resume}")
+
+    return _save_asset(self, asset_id, destination, chunk_size, verify_checksum, checksum, resume) is not None
+
+
+def download_assets(self, assets, destination_dir, max_workers=4, skip_existing: bool = True,
+                    verify_checksum: bool = False, resume: bool = True, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                    progress_callback=None) -> dict:
+    logging.debug(f"### Download assets to destination_dir : {destination_dir} with max_workers : {max_workers}, "
+                  f"skip_existing : {skip_existing}, verify_checksum : {verify_checksum} and resume : {resume}")
+
+    os.makedirs(destination_dir, exist_ok=True)
+
+    report = {
+        "downloaded": [],
+        "skipped": [],
+        "failed": [],
+        "bytes": 0,
+        "elapsed": 0.0,
+        "bytes_per_second": 0.0
+    }
+    started_at = time.monotonic()
+
+    def download(asset):
+        asset_id = asset if isinstance(asset, str) else asset['id']
+        # A connection or disk error only fails its own asset, the partial file is kept to be resumed
         try:
-            image = Image.open(image_bytes)
-            image.load()  # Force loading the image data while the file is open
-            image_bytes.close()  # Now we can safely close the stream
-            return image
-        except UnidentifiedImageError:
-            print(
-                f"Failed to identify image for asset_id {asset_id}. Content-Type: {response.headers.get('Content-Type')}")
-            image_bytes.close()  # Ensure the stream is closed even if an error occurs
-            return False
-        finally:
-            image_bytes.close()  # Ensure the stream is always closed
-            del image_bytes
-    else:
-        logging.error(f'Failed Downloading File {asset_id} with status code {response.status_code}')
+            return download_one(asset)
+        except (requests.RequestException, OSError) as exception:
+            logging.error(f'Failed to download asset {asset_id} : {exception}')
+            return asset_id, "failed", 0
+
+    def download_one(asset):
+        # Plain ids are resolved to get the file name, size and checksum of the original
+        if isinstance(asset, str):
+            asset_id = asset
+            asset = get_asset_info(self, asset_id)
+            if asset is None:
+                return asset_id, "failed", 0
+        asset_id = asset['id']
+        path = os.path.join(destination_dir, f"{asset_id}_{asset['originalFileName']}")
+
+        if skip_existing and _is_asset_saved(asset, path, verify_checksum):
+            return asset_id, "skipped", 0
+
+        size = _save_asset(self, asset_id, path, chunk_size, verify_checksum, asset.get('checksum'), resume)
+        return asset_id, "failed" if size is None else "downloaded", size or 0
+
+    # Only a bounded window of assets is scheduled so that a full-sync stream is never materialized
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-download') as executor:
+        pending = set()
+        assets = iter(assets)
+        while True:
+            for asset in assets:
+                pending.add(executor.submit(download, asset))
+                if len(pending) >= max_workers * 2:
+                    break
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                asset_id, status, size = future.result()
+                report[status].append(asset_id)
+                report["bytes"] += size
+                report["elapsed"] = time.monotonic() - started_at
+                report["bytes_per_second"] = report["bytes"] / report["elapsed"] if report["elapsed"] else 0.0
+                if progress_callback is not None:
+                    progress_callback(asset_id, status, report)
+
+    logging.debug(f"### Download assets done : {len(report['downloaded'])} downloaded, {len(report['skipped'])} "
+                  f"skipped, {len(report['failed'])} failed, {report['bytes_per_second']:.0f} bytes/s")
+    return report
+
+
+def _is_asset_saved(asset, path, verify_checksum) -> bool:
+    if not os.path.isfile(path):
         return False
 
+    expected_size = (asset.get('exifInfo') or {}).get('fileSizeInByte')
+    if expected_size is not None and os.path.getsize(path) != expected_size:
+        return False
 
-def delete_assets(self, assets_ids) -> bool:
-    logging.debug(f"### Delete assets with assets_ids : {assets_ids}")
+    if verify_checksum:
+        hasher = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        return base64.b64encode(hasher.digest()).decode() == asset.get('checksum')
 
-    url = f'{self.base_url}/api/assets'
+    return True
+
+
+def _save_asset(self, asset_id, destination, chunk_size, verify_checksum, checksum, resume) -> object:
+    if verify_checksum and checksum is None:
+        asset_info = get_asset_info(self, asset_id)
+        if asset_info is None:
+            return None
+        checksum = asset_info.get('checksum')
+
+    url = f'{self.base_url}/api/assets/{asset_id}/original'
+
+    is_file_like = hasattr(destination, 'write')
+    part_path = None if is_file_like else f'{os.fspath(destination)}.part'
+
+    requests_kwargs = dict(self.requests_kwargs)
+    offset = os.path.getsize(part_path) if resume and part_path and os.path.isfile(part_path) else 0
+    if offset:
+        requests_kwargs['headers'] = {**requests_kwargs['headers'], 'Range': f'bytes={offset}-'}
+
+    with self.session.get(url, **requests_kwargs, verify=True, stream=True) as response:
+        if response.status_code == 416:
+            # The partial file does not match the original anymore, it is downloaded again from the start
+            os.remove(part_path)
+            return _save_asset(self, asset_id, destination, chunk_size, verify_checksum, checksum, False)
+
+        if response.status_code not in (200, 206):
+            logging.error(f'Failed saving asset {asset_id} with status code {response.status_code}')
+            logging.error(response.text)
+            return None
+
+        hasher = hashlib.sha1() if verify_checksum else None
+
+        if is_file_like:
+            size = _write_response(response, destination, chunk_size, hasher)
+        else:
+            # The original is written next to its destination and only moved in place once complete
+            if response.status_code == 206:
+                logging.debug(f"### Resume asset {asset_id} from byte {offset}")
+                if hasher is not None:
+                    with open(part_path, 'rb') as part_file:
+                        for chunk in iter(lambda: part_file.read(chunk_size), b''):
+                            hasher.update(chunk)
+                mode = 'ab'
+            else:
+                mode = 'wb'
+            with open(part_path, mode) as part_file:
+                size = _write_response(response, part_file, chunk_size, hasher)
+
+    if hasher is not None and base64.b64encode(hasher.digest()).decode() != checksum:
+        logging.error(f'Checksum mismatch for asset {asset_id}, expected {checksum}')
+        if not is_file_like:
+            os.remove(part_path)
+        return None
+
+    if not is_file_like:
+        os.replace(part_path, destination)
+
+    logging.debug(f"### Save asset done : {size} bytes")
+    return size
+
+
+def _write_response(response, file, chunk_size, hasher=None) -> int:
+    size = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        file.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+        size += len(chunk)
+    return size
+
+
+def check_bulk_upload(self, checksums) -> object:
+    logging.debug(f"### Check bulk upload of {len(checksums)} checksums")
+
+    url = f'{self.base_url}/api/assets/bulk-upload-check'
 
     # Creates JSON payload with data
     payload = {
-        "force": True,
-        "ids": list(assets_ids)
+        "assets": [{"id": item_id, "checksum": checksum} for item_id, checksum in checksums.items()]
     }
 
     # Converts payload to JSON
     payload = json.dumps(payload)
 
-    response = requests.delete(url, data=payload, **self.requests_kwargs, verify=True)
+    response = self.session.post(url, data=payload, **self.requests_kwargs, verify=True)
 
-    if response.status_code == 204:
-        logging.debug(f"### Delete assets done")
-        return True
+    if response.status_code == 200:
+        return {item['id']: item for item in loads(response.content).get('results', [])}
     else:
-        logging.error(f'Failed deleting assets {assets_ids} with status code {response.status_code}')
+        logging.error(f'Failed to check bulk upload of {len(checksums)} checksums with status code '
+                      f'{response.status_code}')
         logging.error(response.text)
-        return False
+        return None
+
+
+def upload_asset(self, path, device_id=UPLOAD_DEVICE_ID, checksum=None) -> object:
+    logging.debug(f"### Upload asset with path : {path} and device_id : {device_id}")
+
+    url = f'{self.base_url}/api/assets'
+
+    stat = os.stat(path)
+    file_name = os.path.basename(path)
+    modified_at = datetime.fromtimestamp(stat.st_mtime, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    fields = {
+        # Same device asset id as the Immich CLI, so that both tools recognize the files uploaded by the other
+        "deviceAssetId": f"{file_name}-{stat.st_size}".replace(' ', ''),
+        "deviceId": device_id,
+        "fileCreatedAt": modified_at,
+        "fileModifiedAt": modified_at
+    }
+    files = {
+        "assetData": (file_name, path, mimetypes.guess_type(file_name)[0] or 'application/octet-stream')
+    }
+
+    headers = {**self.requests_kwargs['headers']}
+    if checksum is not None:
+        # The server rejects a known file before its upload completes
+        headers['x-immich-checksum'] = checksum
+
+    # The file is streamed from the disk while the request is sent
+    with MultipartBody(fields, files) as body:
+        headers['Content-Type'] = body.content_type
+        response = self.session.post(url, data=body, **{**self.requests_kwargs, 'headers': headers}, verify=True)
+
+    if response.status_code in (200, 201):
+        uploaded_asset = loads(response.content)
+        log_payload(self, "### Response upload asset : %s", uploaded_asset)
+        return uploaded_asset
+    else:
+        logging.error(f'Failed to upload asset {path} with status code {response.status_code}')
+        logging.error(response.text)
+        return None
+
+
+def upload_assets(self, paths, device_id=UPLOAD_DEVICE_ID, max_workers=4, hash_workers=None,
+                  check_duplicates: bool = True, batch_size=UPLOAD_CHECK_BATCH_SIZE, progress_callback=None) -> dict:
+    logging.debug(f"### Upload assets with device_id : {device_id}, max_workers : {max_workers}, hash_workers : "
+                  f"{hash_workers}, check_duplicates : {check_duplicates} and batch_size : {batch_size}")
+
+    report = {
+        "uploaded": [],
+        "duplicates": [],
+        "rejected": [],
+        "failed": [],
+        "assets": {},
+        "bytes": 0,
+        "elapsed": 0.0,
+        "bytes_per_second": 0.0
+    }
+    started_at = time.monotonic()
+
+    def add_result(path, status, asset_id=None, size=0):
+        report[status].append(path)
+        if asset_id is not None:
+            report["assets"][path] = asset_id
+        report["bytes"] += size
+        report["elapsed"] = time.monotonic() - started_at
+        report["bytes_per_second"] = report["bytes"] / report["elapsed"] if report["elapsed"] else 0.0
+        if progress_callback is not None:
+            progress_callback(path, status, report)
+
+    def upload(item):
+        path, checksum = item
+        try:
+            return path, upload_asset(self, path, device_id, checksum)
+        except OSError as error:
+            # A file gone since it was hashed, or a connection error, only fails this file
+            logging.error(f'Failed to upload asset {path} : {error}')
+            return path, None
+
+    with ThreadPoolExecutor(max_workers=hash_workers or os.cpu_count(), thread_name_prefix='pymmich-hash') as hasher, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-upload') as uploader:
+
+        def hash_batch(batch):
+            return [(path, hasher.submit(_hash_file, path)) for path in batch] if batch else None
+
+        # The checksums of the next batch are computed while the current one is uploaded
+        batches = _iter_batches(paths, batch_size)
+        hashing = hash_batch(next(batches, None))
+        while hashing is not None:
+            next_hashing = hash_batch(next(batches, None))
+
+            checksums = {}
+            for path, checksum in hashing:
+                checksum = checksum.result()
+                if checksum is None:
+                    add_result(path, "failed")
+                else:
+                    checksums[path] = checksum
+
+            accepted = list(checksums.items())
+            if check_duplicates and checksums:
+                # Files already on the server, uploaded by a previous run for instance, are skipped
+                results = check_bulk_upload(self, checksums)
+                if results is not None:
+                    accepted = []
+                    for path, checksum in checksums.items():
+                        result = results.get(path) or {}
+                        if result.get('action') == 'reject':
+                            add_result(path, "duplicates" if result.get('reason') == 'duplicate' else "rejected",
+                                       result.get('assetId'))
+                        else:
+                            accepted.append((path, checksum))
+
+            for path, uploaded_asset in uploader.map(upload, accepted):
+                if uploaded_asset is None:
+                    add_result(path, "failed")
+                elif uploaded_asset.get('status') == 'duplicate':
+                    add_result(path, "duplicates", uploaded_asset.get('id'))
+                else:
+                    add_result(path, "uploaded", uploaded_asset.get('id'), os.path.getsize(path))
+
+            hashing = next_hashing
+
+    logging.debug(f"### Upload assets done : {len(report['uploaded'])} uploaded, {len(report['duplicates'])} "
+                  f"duplicates, {len(report['rejected'])} rejected, {len(report['failed'])} failed, "
+                  f"{report['bytes_per_second']:.0f} bytes/s")
+    return report
+
+
+def _iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _hash_file(path) -> object:
+    # hashlib releases the GIL on large buffers, the files are hashed in parallel by threads
+    hasher = hashlib.sha1()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+    except OSError as error:
+        logging.error(f'Failed to read {path} : {error}')
+        return None
+    return hasher.hexdigest()
+
+
+def delete_assets(self, assets_ids, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                  retries=DEFAULT_BATCH_RETRIES) -> bool:
+    results = bulk_delete_assets(self, assets_ids, batch_size, max_workers, retries)
+    return all(result["error"] != BATCH_FAILED for result in results.values())
+
+
+@invalidates("album", "albums")
+def bulk_delete_assets(self, assets_ids, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                       retries=DEFAULT_BATCH_RETRIES) -> dict:
+    assets_ids = list(assets_ids)
+    logging.debug(f"### Delete assets with {len(assets_ids)} assets_ids in batches of {batch_size}")
+
+    url = f'{self.base_url}/api/assets'
+
+    def send_batch(batch):
+        # Creates JSON payload with data
+        payload = {
+            "force": True,
+            "ids": batch
+        }
+
+        # Converts payload to JSON
+        payload = json.dumps(payload)
+
+        response = self.session.delete(url, data=payload, **self.requests_kwargs, verify=True)
+
+        if response.status_code == 204:
+            return {}
+        else:
+            logging.error(f'Failed deleting {len(batch)} assets with status code {response.status_code}')
+            logging.error(response.text)
+            return None
+
+    results = run_in_batches(assets_ids, send_batch, batch_size, max_workers, retries)
+    logging.debug(f"### Delete assets done")
+    return results
 
 
 def view_asset(self, asset_id) -> object:
@@ -171,10 +807,10 @@ def view_asset(self, asset_id) -> object:
 
     url = f'{self.base_url}/api/assets/{asset_id}/thumbnail'
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response asset thumbnail : {response.content}")
+        log_payload(self, "### Response asset thumbnail : %s", response.content)
         return response.content
     else:
         logging.error(f'Failed to retrieve asset {asset_id} thumbnail with status code {response.status_code}')
@@ -182,27 +818,68 @@ def view_asset(self, asset_id) -> object:
         return None
 
 
-def run_asset_jobs(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL) -> bool:
-    logging.debug(f"### Run asset jobs with assets_ids : {assets_ids} and asset_job : {asset_job}")
-
-    url = f'{self.base_url}/api/assets/jobs'
+def get_asset_thumbnail(self, asset_id, etag=None) -> object:
+    logging.debug(f"### Get asset thumbnail with asset_id : {asset_id} and etag : {etag}")
 
-    # Creates JSON payload with data
-    payload = {
-        "name": asset_job,
-        "assetIds": list(assets_ids)
-    }
+    url = f'{self.base_url}/api/assets/{asset_id}/thumbnail'
 
-    # Converts payload to JSON
-    payload = json.dumps(payload)
+    requests_kwargs = dict(self.requests_kwargs)
+    if etag is not None:
+        # The server answers 304 without body when the thumbnail did not change
+        requests_kwargs['headers'] = {**requests_kwargs['headers'], 'If-None-Match': etag}
 
-    response = requests.post(url, data=payload, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **requests_kwargs, verify=True)
 
-    if response.status_code == 204:
-        logging.debug(f"### Run asset jobs done")
-        return True
+    if response.status_code in (200, 304):
+        return {
+            "not_modified": response.status_code == 304,
+            "content": response.content if response.status_code == 200 else None,
+            "etag": response.headers.get('ETag', etag),
+            "content_type": response.headers.get('Content-Type')
+        }
     else:
-        logging.error(f'Failed running asset jobs with assets_ids : {assets_ids} and asset_job : {asset_job} '
-                      f'with status code {response.status_code}')
+        logging.error(f'Failed to retrieve asset {asset_id} thumbnail with status code {response.status_code}')
         logging.error(response.text)
-        return False
+        return None
+
+
+def run_asset_jobs(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL,
+                   batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                   retries=DEFAULT_BATCH_RETRIES) -> bool:
+    results = bulk_run_asset_jobs(self, assets_ids, asset_job, batch_size, max_workers, retries)
+    return all(result["error"] != BATCH_FAILED for result in results.values())
+
+
+@invalidates("jobs")
+def bulk_run_asset_jobs(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL,
+                        batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                        retries=DEFAULT_BATCH_RETRIES) -> dict:
+    assets_ids = list(assets_ids)
+    logging.debug(f"### Run asset jobs with {len(assets_ids)} assets_ids in batches of {batch_size} and "
+                  f"asset_job : {asset_job}")
+
+    url = f'{self.base_url}/api/assets/jobs'
+
+    def send_batch(batch):
+        # Creates JSON payload with data
+        payload = {
+            "name": asset_job,
+            "assetIds": batch
+        }
+
+        # Converts payload to JSON
+        payload = json.dumps(payload)
+
+        response = self.session.post(url, data=payload, **self.requests_kwargs, verify=True)
+
+        if response.status_code == 204:
+            return {}
+        else:
+            logging.error(f'Failed running asset jobs for {len(batch)} assets and asset_job : {asset_job} '
+                          f'with status code {response.status_code}')
+            logging.error(response.text)
+            return None
+
+    results = run_in_batches(assets_ids, send_batch, batch_size, max_workers, retries)
+    logging.debug(f"### Run asset jobs done")
+    return results
@@ -0,0 +1,59 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_BATCH_WORKERS = 4
+DEFAULT_BATCH_RETRIES = 2
+
+BATCH_FAILED = "batch_failed"
+
+
+def run_in_batches(ids, send_batch, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                   retries=DEFAULT_BATCH_RETRIES) -> dict:
+    """
+    Sends ids in concurrent batches and aggregates the per-id results
+
+    :param ids: the ids to send, duplicates are sent once
+    :param send_batch: a function sending one batch and returning a dict of id -> error (None on success),
+                       or None when the whole request failed
+    :param batch_size: the maximum number of ids per request
+    :param max_workers: the maximum number of requests sent at the same time
+    :param retries: how many times a failed batch is sent again, only failed batches are retried
+    :return: a dict of id -> {"success": bool, "error": str | None}
+    """
+    def send(batch):
+        # A connection reset or a timeout only fails its own batch, which is retried like any failed request
+        try:
+            return send_batch(batch)
+        except requests.RequestException as exception:
+            logging.error(f'Failed to send a batch of {len(batch)} ids : {exception}')
+            return None
+
+    ids = list(dict.fromkeys(ids))
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-batch') as executor:
+        for attempt in range(retries + 1):
+            if not batches:
+                break
+            if attempt:
+                logging.debug(f"### Retry {len(batches)} failed batches, attempt {attempt}")
+
+            failed_batches = []
+            for batch, batch_results in zip(batches, executor.map(send, batches)):
+                if batch_results is None:
+                    failed_batches.append(batch)
+                    continue
+                for batch_id in batch:
+                    error = batch_results.get(batch_id)
+                    results[batch_id] = {"success": error is None, "error": error}
+            batches = failed_batches
+
+    for batch in batches:
+        for batch_id in batch:
+            results[batch_id] = {"success": False, "error": BATCH_FAILED}
+
+    return results
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from pymmich.models import dumps, loads
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTLS = {
+    "user": 300,
+    "album": 30,
+    "albums": 30,
+    "libraries": 60,
+    "jobs": 2,
+}
+
+
+class ResponseCache:
+    """TTL + LRU cache of the responses of the read-mostly endpoints"""
+
+    def __init__(self, ttls: dict = None, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """
+        Constructor
+
+        :param ttls: the time to live in seconds per endpoint, merged over DEFAULT_CACHE_TTLS
+        :param max_size: the maximum number of cached responses, the least recently used ones are evicted first
+        """
+        self.ttls = {**DEFAULT_CACHE_TTLS, **(ttls or {})}
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, key):
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end((endpoint, key))
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[(endpoint, key)]
+            self.misses += 1
+            return None
+
+    def set(self, endpoint, key, value) -> None:
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return
+
+        with self._lock:
+            self._entries[(endpoint, key)] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end((endpoint, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *endpoints) -> None:
+        """
+        Drops the cached responses of the given endpoints, or of every endpoint when none is given
+        """
+        with self._lock:
+            if not endpoints:
+                self._entries.clear()
+                return
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] in endpoints]:
+                del self._entries[cache_key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size
+            }
+
+
+def cached(endpoint):
+    """
+    Serves the decorated endpoint function from the client cache when it is enabled, failed calls are not cached
+
+    Every hit returns its own copy of the response, so that a caller modifying it never alters the cached one.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            value = cache.get(endpoint, key)
+            if value is not None:
+                logging.debug(f"### Cache hit for {endpoint} with {key}")
+                return _thaw(value)
+
+            value = func(self, *args, **kwargs)
+            if value is not None:
+                cache.set(endpoint, key, _freeze(value))
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def _freeze(value) -> tuple:
+    # Raw responses are kept encoded, every hit decodes a fresh copy. Typed models are read-only, they are kept as they
+    # are and only the list or dictionary holding them is copied, here and on every hit
+    try:
+        return True, dumps(value)
+    except TypeError:
+        return False, type(value)(value) if isinstance(value, (list, dict)) else value
+
+
+def _thaw(frozen) -> object:
+    is_encoded, value = frozen
+    if is_encoded:
+        return loads(value)
+    if isinstance(value, (list, dict)):
+        return type(value)(value)
+    return value
+
+
+def invalidates(*endpoints, album_index: bool = True):
+    """
+    Drops the cached responses of the given endpoints once the decorated mutating function has run, the album index
+    is marked as stale along with the albums list unless the function updates the index itself
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                cache = getattr(self, 'cache', None)
+                if cache is not None:
+                    cache.invalidate(*endpoints)
+                index = getattr(self, 'album_index', None)
+                if index is not None and album_index and 'albums' in endpoints:
+                    index.invalidate()
+
+        return wrapper
+
+    return decorator
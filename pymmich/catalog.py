@@ -0,0 +1,301 @@
+import json
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from pymmich import album, asset, user
+from pymmich.batch import DEFAULT_BATCH_WORKERS
+from pymmich.models import Album, Asset, User, loads, to_model
+
+DEFAULT_CATALOG_PAGE_SIZE = 1000
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assets (
+    id TEXT PRIMARY KEY,
+    owner_id TEXT,
+    type TEXT,
+    original_file_name TEXT,
+    checksum TEXT,
+    is_trashed INTEGER,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_owner_id ON assets (owner_id, updated_at);
+CREATE INDEX IF NOT EXISTS assets_updated_at ON assets (updated_at);
+CREATE INDEX IF NOT EXISTS assets_checksum ON assets (checksum);
+CREATE TABLE IF NOT EXISTS albums (
+    id TEXT PRIMARY KEY,
+    album_name TEXT,
+    owner_id TEXT,
+    asset_count INTEGER,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS albums_album_name ON albums (album_name);
+CREATE TABLE IF NOT EXISTS album_assets (
+    album_id TEXT NOT NULL,
+    asset_id TEXT NOT NULL,
+    PRIMARY KEY (album_id, asset_id)
+);
+CREATE INDEX IF NOT EXISTS album_assets_asset_id ON album_assets (asset_id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id TEXT PRIMARY KEY,
+    updated_until TEXT NOT NULL
+);
+"""
+
+
+class LocalCatalog:
+    """SQLite mirror of the assets, albums and users, refreshed incrementally from the sync endpoints"""
+
+    def __init__(self, client, path: str = ':memory:') -> None:
+        """
+        Constructor
+
+        :param client: the PymmichClient used to refresh the catalog
+        :param path: the SQLite database file, created if needed, the catalog is kept in memory by default
+        """
+        self.client = client
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def refresh(self, users_ids=None, with_albums: bool = True, full: bool = False) -> dict:
+        """
+        Brings the catalog up to date, only the assets changed since the last refresh of a user are downloaded
+
+        :param users_ids: the users whose assets are mirrored, the current user by default
+        :param with_albums: whether to refresh the albums and their assets as well
+        :param full: whether to download every asset again instead of the changes only
+        :return: a dict of user id -> {"full", "upserted", "deleted"}, or None when the refresh of the user failed
+        """
+        if users_ids is None:
+            my_user = user.get_my_user(self.client)
+            if my_user is None:
+                return {}
+            users_ids = [my_user['id']]
+        users_ids = list(dict.fromkeys(users_ids))
+        logging.debug(f"### Refresh catalog for users {users_ids} with with_albums : {with_albums} and full : {full}")
+
+        results = {user_id: self._refresh_assets(user_id, full) for user_id in users_ids}
+        self._refresh_users(users_ids)
+        if with_albums:
+            self.refresh_albums()
+        return results
+
+    def refresh_albums(self, max_workers: int = DEFAULT_BATCH_WORKERS) -> bool:
+        """
+        Refreshes the albums, the assets of an album are only downloaded again when the album changed
+
+        :param max_workers: the maximum number of albums downloaded at the same time
+        """
+        albums = album.get_albums(self.client)
+        if albums is None:
+            return False
+
+        with self._lock:
+            known_albums = {album_id: (updated_at, asset_count) for album_id, updated_at, asset_count in
+                            self._connection.execute("SELECT id, updated_at, asset_count FROM albums")}
+
+        changed_albums = [item for item in albums if
+                          known_albums.get(item['id']) != (_to_date(item.get('updatedAt')), item.get('assetCount'))]
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-catalog') as executor:
+            full_albums = list(executor.map(lambda item: album.get_album(self.client, item['id']), changed_albums))
+        if None in full_albums:
+            logging.error('Failed to refresh the albums of the catalog')
+            return False
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO albums (id, album_name, owner_id, asset_count, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(item['id'], item.get('albumName'), item.get('ownerId'), item.get('assetCount'),
+                  _to_date(item.get('updatedAt')), _dumps(item)) for item in full_albums])
+            self._connection.executemany("DELETE FROM album_assets WHERE album_id = ?",
+                                         [(item['id'],) for item in full_albums])
+            self._connection.executemany("INSERT OR IGNORE INTO album_assets (album_id, asset_id) VALUES (?, ?)",
+                                         [(item['id'], album_asset['id']) for item in full_albums
+                                          for album_asset in item.get('assets') or []])
+
+            deleted_albums = [(album_id,) for album_id in known_albums.keys() - {item['id'] for item in albums}]
+            self._connection.executemany("DELETE FROM albums WHERE id = ?", deleted_albums)
+            self._connection.executemany("DELETE FROM album_assets WHERE album_id = ?", deleted_albums)
+
+        logging.debug(f"### Catalog albums refreshed, {len(full_albums)} changed and {len(deleted_albums)} deleted")
+        return True
+
+    def get_asset(self, asset_id) -> object:
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM assets WHERE id = ?", (asset_id,)).fetchone()
+        return to_model(self.client, Asset, loads(row[0])) if row else None
+
+    def get_assets_without_album(self, owner_id=None, with_trashed: bool = False) -> list:
+        """
+        Returns the assets which are in no album
+
+        :param owner_id: only returns the assets of this user
+        :param with_trashed: whether to return the trashed assets as well
+        """
+        return self._select_assets("NOT EXISTS (SELECT 1 FROM album_assets WHERE asset_id = assets.id)", (),
+                                   owner_id, with_trashed)
+
+    def get_assets_updated_since(self, updated_after: datetime, owner_id=None, with_trashed: bool = False) -> list:
+        """
+        Returns the assets updated after a date, the most recently updated first
+
+        :param updated_after: the date, assumed to be UTC when it has no timezone
+        :param owner_id: only returns the assets of this user
+        :param with_trashed: whether to return the trashed assets as well
+        """
+        _, updated_after = asset._check_full_sync_dates(None, updated_after)
+        return self._select_assets("updated_at > ?", (updated_after.strftime(DATE_FORMAT),), owner_id, with_trashed,
+                                   "ORDER BY updated_at DESC")
+
+    def get_assets_by_checksum(self, checksum) -> list:
+        return self._select_assets("checksum = ?", (checksum,), None, True)
+
+    def get_album(self, album_id) -> object:
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM albums WHERE id = ?", (album_id,)).fetchone()
+        return to_model(self.client, Album, loads(row[0])) if row else None
+
+    def get_albums_by_asset(self, asset_id) -> list:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT albums.data FROM albums JOIN album_assets ON album_assets.album_id = albums.id "
+                "WHERE album_assets.asset_id = ?", (asset_id,)).fetchall()
+        return to_model(self.client, Album, [loads(row[0]) for row in rows])
+
+    def get_user(self, user_id) -> object:
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+        return to_model(self.client, User, loads(row[0])) if row else None
+
+    def get_sync_state(self, user_id) -> object:
+        """
+        Returns the high-water mark of a user, the date up to which the catalog holds their assets
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT updated_until FROM sync_state WHERE user_id = ?",
+                                           (user_id,)).fetchone()
+        return datetime.strptime(row[0], DATE_FORMAT).replace(tzinfo=timezone.utc) if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _refresh_assets(self, user_id, full) -> object:
+        updated_after = None if full else self.get_sync_state(user_id)
+
+        # The changes made while refreshing are picked up again by the next refresh, upserts being idempotent
+        updated_until = datetime.now(timezone.utc).strftime(DATE_FORMAT)
+
+        if updated_after is not None:
+            delta = asset.get_delta_sync(self.client, [user_id], updated_after)
+            if delta is not None and not delta.get('needsFullSync'):
+                upserted = [item for item in delta.get('upserted', []) if item.get('ownerId', user_id) == user_id]
+                with self._lock, self._connection:
+                    self._upsert_assets(upserted)
+                    self._connection.executemany("DELETE FROM assets WHERE id = ?",
+                                                 [(asset_id,) for asset_id in delta.get('deleted', [])])
+                    self._set_sync_state(user_id, updated_until)
+                logging.debug(f"### Catalog delta refresh for user {user_id} : {len(upserted)} upserted and "
+                              f"{len(delta.get('deleted', []))} deleted")
+                return {"full": False, "upserted": len(upserted), "deleted": len(delta.get('deleted', []))}
+
+        return self._refresh_all_assets(user_id, updated_until)
+
+    def _refresh_all_assets(self, user_id, updated_until) -> object:
+        upserted = 0
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TEMP TABLE IF NOT EXISTS seen_assets "
+                                     "(owner_id TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (owner_id, id))")
+            self._connection.execute("DELETE FROM seen_assets WHERE owner_id = ?", (user_id,))
+
+        # Pages are downloaded without holding the lock, the readers only wait while a page is written
+        assets = asset.iter_full_sync(self.client, user_id, updated_until, limit=DEFAULT_CATALOG_PAGE_SIZE,
+                                      use_delta_sync=False)
+        try:
+            for page in asset._iter_batches(assets, DEFAULT_CATALOG_PAGE_SIZE):
+                with self._lock, self._connection:
+                    self._upsert_assets(page)
+                    self._connection.executemany("INSERT OR IGNORE INTO seen_assets (owner_id, id) VALUES (?, ?)",
+                                                 [(user_id, item['id']) for item in page])
+                upserted += len(page)
+        except asset.FullSyncError:
+            # A missing page would otherwise be taken for deleted assets, the pages already written are up to date
+            # and the deleted assets are pruned by the next full refresh
+            with self._lock, self._connection:
+                self._connection.execute("DELETE FROM seen_assets WHERE owner_id = ?", (user_id,))
+            logging.error(f'Failed to refresh the catalog assets of user {user_id}')
+            return None
+
+        with self._lock, self._connection:
+            deleted = self._connection.execute(
+                "DELETE FROM assets WHERE owner_id = ? AND id NOT IN (SELECT id FROM seen_assets WHERE owner_id = ?)",
+                (user_id, user_id)).rowcount
+            self._connection.execute("DELETE FROM seen_assets WHERE owner_id = ?", (user_id,))
+            self._set_sync_state(user_id, updated_until)
+
+        logging.debug(f"### Catalog full refresh for user {user_id} : {upserted} upserted and {deleted} deleted")
+        return {"full": True, "upserted": upserted, "deleted": deleted}
+
+    def _refresh_users(self, users_ids) -> None:
+        users = [item for item in user.get_users(self.client, users_ids).values() if item is not None]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO users (id, name, email, data) VALUES (?, ?, ?, ?)",
+                                         [(item['id'], item.get('name'), item.get('email'), _dumps(item))
+                                          for item in users])
+
+    def _upsert_assets(self, assets) -> None:
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO assets (id, owner_id, type, original_file_name, checksum, is_trashed, updated_at, "
+            "data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(item['id'], item.get('ownerId'), item.get('type'), item.get('originalFileName'), item.get('checksum'),
+              bool(item.get('isTrashed')), _to_date(item.get('updatedAt')), _dumps(item)) for item in assets])
+
+    def _set_sync_state(self, user_id, updated_until) -> None:
+        self._connection.execute("INSERT OR REPLACE INTO sync_state (user_id, updated_until) VALUES (?, ?)",
+                                 (user_id, updated_until))
+
+    def _select_assets(self, condition, parameters, owner_id, with_trashed, order_by='') -> list:
+        query = f"SELECT data FROM assets WHERE {condition}"
+        if owner_id is not None:
+            query += " AND owner_id = ?"
+            parameters += (owner_id,)
+        if not with_trashed:
+            query += " AND NOT is_trashed"
+
+        with self._lock:
+            rows = self._connection.execute(f"{query} {order_by}", parameters).fetchall()
+        return to_model(self.client, Asset, [loads(row[0]) for row in rows])
+
+
+def _to_date(value) -> object:
+    # Dates are stored in UTC with a fixed format so that they compare as strings
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).astimezone(timezone.utc).strftime(DATE_FORMAT)
+
+
+def _dumps(item) -> str:
+    # Models are serialized from their raw data
+    return json.dumps(dict(item))
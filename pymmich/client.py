@@ -1,8 +1,21 @@
 """ Python wrapper for the Immich API """
-from pymmich import album, asset, library, user, job
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from pymmich import album, asset, dedupe, library, user, job
+from pymmich.album_index import AlbumIndex
+from pymmich.batch import DEFAULT_BATCH_SIZE, DEFAULT_BATCH_WORKERS, DEFAULT_BATCH_RETRIES
+from pymmich.cache import ResponseCache, DEFAULT_CACHE_SIZE
 from pymmich.enums.asset_job import AssetJob
 from pymmich.enums.job_name import JobName
+from pymmich.enums.job_wait_condition import JobWaitCondition
 from pymmich.enums.library_type import LibraryType
+from pymmich.metrics import MetricsRegistry
+from pymmich.rate_limit import TokenBucket
+from pymmich.session import create_session, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE, DEFAULT_RETRIES, \
+    DEFAULT_BACKOFF_FACTOR, DEFAULT_BACKOFF_MAX
+from pymmich.single_flight import SingleFlight
 
 
 class AlbumClient:
@@ -12,23 +25,83 @@ class AlbumClient:
     def get_album(self, album_id=None) -> object:
         return album.get_album(self.parent_client, album_id)
 
+    async def get_album_async(self, album_id=None) -> object:
+        return await self.parent_client.run_in_executor(album.get_album, self.parent_client, album_id)
+
     def get_album_by_id(self, album_id=None) -> object:
         return album.get_album(self.parent_client, album_id)
 
+    async def get_album_by_id_async(self, album_id=None) -> object:
+        return await self.parent_client.run_in_executor(album.get_album, self.parent_client, album_id)
+
     def get_album_by_name(self, target_album_name, albums=None) -> object:
         return album.get_album_by_name(self.parent_client, target_album_name, albums)
 
+    async def get_album_by_name_async(self, target_album_name, albums=None) -> object:
+        return await self.parent_client.run_in_executor(album.get_album_by_name, self.parent_client,
+                                                        target_album_name, albums)
+
+    def get_albums_by_names(self, target_albums_names) -> dict:
+        return album.get_albums_by_names(self.parent_client, target_albums_names)
+
+    async def get_albums_by_names_async(self, target_albums_names) -> dict:
+        return await self.parent_client.run_in_executor(album.get_albums_by_names, self.parent_client,
+                                                        target_albums_names)
+
+    def get_albums_by_asset(self, asset_id) -> list:
+        return album.get_albums_by_asset(self.parent_client, asset_id)
+
+    async def get_albums_by_asset_async(self, asset_id) -> list:
+        return await self.parent_client.run_in_executor(album.get_albums_by_asset, self.parent_client, asset_id)
+
+    def refresh_album_index(self, with_assets: bool = False) -> bool:
+        return album.refresh_album_index(self.parent_client, with_assets)
+
+    async def refresh_album_index_async(self, with_assets: bool = False) -> bool:
+        return await self.parent_client.run_in_executor(album.refresh_album_index, self.parent_client, with_assets)
+
     def get_albums(self, asset_id=None, shared_album=None) -> object:
         return album.get_albums(self.parent_client, asset_id, shared_album)
 
+    async def get_albums_async(self, asset_id=None, shared_album=None) -> object:
+        return await self.parent_client.run_in_executor(album.get_albums, self.parent_client, asset_id, shared_album)
+
     def create_album(self, album_name, owners_id) -> bool:
         return album.create_album(self.parent_client, album_name, owners_id)
 
+    async def create_album_async(self, album_name, owners_id) -> bool:
+        return await self.parent_client.run_in_executor(album.create_album, self.parent_client, album_name, owners_id)
+
+    def create_albums(self, albums, max_workers=DEFAULT_BATCH_WORKERS) -> dict:
+        return album.create_albums(self.parent_client, albums, max_workers)
+
+    async def create_albums_async(self, albums, max_workers=DEFAULT_BATCH_WORKERS) -> dict:
+        return await self.parent_client.run_in_executor(album.create_albums, self.parent_client, albums, max_workers)
+
     def delete_album(self, album_id) -> bool:
         return album.delete_album(self.parent_client, album_id)
 
-    def add_assets_to_album(self, album_id, assets_ids) -> bool:
-        return album.add_assets_to_album(self.parent_client, album_id, assets_ids)
+    async def delete_album_async(self, album_id) -> bool:
+        return await self.parent_client.run_in_executor(album.delete_album, self.parent_client, album_id)
+
+    def add_assets_to_album(self, album_id, assets_ids, batch_size=DEFAULT_BATCH_SIZE,
+                            max_workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_BATCH_RETRIES) -> bool:
+        return album.add_assets_to_album(self.parent_client, album_id, assets_ids, batch_size, max_workers, retries)
+
+    async def add_assets_to_album_async(self, album_id, assets_ids, batch_size=DEFAULT_BATCH_SIZE,
+                                        max_workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_BATCH_RETRIES) -> bool:
+        return await self.parent_client.run_in_executor(album.add_assets_to_album, self.parent_client,
+                                                        album_id, assets_ids, batch_size, max_workers, retries)
+
+    def bulk_add_assets_to_album(self, album_id, assets_ids, batch_size=DEFAULT_BATCH_SIZE,
+                                 max_workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_BATCH_RETRIES) -> dict:
+        return album.bulk_add_assets_to_album(self.parent_client, album_id, assets_ids, batch_size, max_workers,
+                                              retries)
+
+    async def bulk_add_assets_to_album_async(self, album_id, assets_ids, batch_size=DEFAULT_BATCH_SIZE,
+                                             max_workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_BATCH_RETRIES) -> dict:
+        return await self.parent_client.run_in_executor(album.bulk_add_assets_to_album, self.parent_client,
+                                                        album_id, assets_ids, batch_size, max_workers, retries)
 
 
 class AssetClient:
@@ -38,28 +111,184 @@ class AssetClient:
     def get_random(self, count=1) -> object:
         return asset.get_random(self.parent_client, count)
 
+    async def get_random_async(self, count=1) -> object:
+        return await self.parent_client.run_in_executor(asset.get_random, self.parent_client, count)
+
     def get_all_user_assets_by_device_id(self, device_id) -> object:
         return asset.get_all_user_assets_by_device_id(self.parent_client, device_id)
 
+    async def get_all_user_assets_by_device_id_async(self, device_id) -> object:
+        return await self.parent_client.run_in_executor(asset.get_all_user_assets_by_device_id, self.parent_client,
+                                                        device_id)
+
     def get_full_sync_for_user(self, user_id, last_asset_id=None, updated_until=None, updated_after=None, limit=100,
                                is_external: bool = False) -> object:
         return asset.get_full_sync_for_user(self.parent_client, user_id, last_asset_id, updated_until, updated_after,
                                             limit, is_external)
 
+    async def get_full_sync_for_user_async(self, user_id, last_asset_id=None, updated_until=None, updated_after=None,
+                                           limit=100, is_external: bool = False) -> object:
+        return await self.parent_client.run_in_executor(asset.get_full_sync_for_user, self.parent_client, user_id,
+                                                        last_asset_id, updated_until, updated_after, limit,
+                                                        is_external)
+
+    def iter_full_sync(self, user_id, updated_until=None, updated_after=None, limit=1000, is_external: bool = False,
+                       use_delta_sync: bool = True):
+        return asset.iter_full_sync(self.parent_client, user_id, updated_until, updated_after, limit, is_external,
+                                    use_delta_sync)
+
+    def iter_full_sync_async(self, user_id, updated_until=None, updated_after=None, limit=1000,
+                             is_external: bool = False, use_delta_sync: bool = True):
+        return asset.iter_full_sync_async(self.parent_client, user_id, updated_until, updated_after, limit,
+                                          is_external, use_delta_sync)
+
+    def get_delta_sync(self, users_ids, updated_after) -> object:
+        return asset.get_delta_sync(self.parent_client, users_ids, updated_after)
+
+    async def get_delta_sync_async(self, users_ids, updated_after) -> object:
+        return await self.parent_client.run_in_executor(asset.get_delta_sync, self.parent_client, users_ids,
+                                                        updated_after)
+
     def get_asset_info(self, asset_id) -> object:
         return asset.get_asset_info(self.parent_client, asset_id)
 
-    def download_asset(self, asset_id) -> object:
-        return asset.download_asset(self.parent_client, asset_id)
-
-    def delete_assets(self, assets_ids) -> bool:
-        return asset.delete_assets(self.parent_client, assets_ids)
+    async def get_asset_info_async(self, asset_id) -> object:
+        return await self.parent_client.run_in_executor(asset.get_asset_info, self.parent_client, asset_id)
+
+    def get_assets_info(self, assets_ids, max_workers=asset.ASSETS_INFO_WORKERS) -> dict:
+        return asset.get_assets_info(self.parent_client, assets_ids, max_workers)
+
+    async def get_assets_info_async(self, assets_ids, max_workers=asset.ASSETS_INFO_WORKERS) -> dict:
+        return await self.parent_client.run_in_executor(asset.get_assets_info, self.parent_client, assets_ids,
+                                                        max_workers)
+
+    def iter_assets_info(self, assets_ids, max_workers=asset.ASSETS_INFO_WORKERS):
+        return asset.iter_assets_info(self.parent_client, assets_ids, max_workers)
+
+    def iter_assets_info_async(self, assets_ids, max_workers=asset.ASSETS_INFO_WORKERS):
+        return asset.iter_assets_info_async(self.parent_client, assets_ids, max_workers)
+
+    def download_asset(self, asset_id, lazy: bool = False, draft_size=None) -> object:
+        return asset.download_asset(self.parent_client, asset_id, lazy, draft_size)
+
+    async def download_asset_async(self, asset_id, lazy: bool = False, draft_size=None) -> object:
+        return await self.parent_client.run_in_executor(asset.download_asset, self.parent_client, asset_id, lazy,
+                                                        draft_size)
+
+    def save_asset(self, asset_id, destination, chunk_size=asset.DOWNLOAD_CHUNK_SIZE, verify_checksum: bool = False,
+                   checksum=None, resume: bool = False) -> bool:
+        return asset.save_asset(self.parent_client, asset_id, destination, chunk_size, verify_checksum, checksum,
+                                resume)
+
+    async def save_asset_async(self, asset_id, destination, chunk_size=asset.DOWNLOAD_CHUNK_SIZE,
+                               verify_checksum: bool = False, checksum=None, resume: bool = False) -> bool:
+        return await self.parent_client.run_in_executor(asset.save_asset, self.parent_client, asset_id, destination,
+                                                        chunk_size, verify_checksum, checksum, resume)
+
+    def download_assets(self, assets, destination_dir, max_workers=4, skip_existing: bool = True,
+                        verify_checksum: bool = False, resume: bool = True, chunk_size=asset.DOWNLOAD_CHUNK_SIZE,
+                        progress_callback=None) -> dict:
+        return asset.download_assets(self.parent_client, assets, destination_dir, max_workers, skip_existing,
+                                     verify_checksum, resume, chunk_size, progress_callback)
+
+    async def download_assets_async(self, assets, destination_dir, max_workers=4, skip_existing: bool = True,
+                                    verify_checksum: bool = False, resume: bool = True,
+                                    chunk_size=asset.DOWNLOAD_CHUNK_SIZE, progress_callback=None) -> dict:
+        return await self.parent_client.run_in_executor(asset.download_assets, self.parent_client, assets,
+                                                        destination_dir, max_workers, skip_existing, verify_checksum,
+                                                        resume, chunk_size, progress_callback)
+
+    def check_bulk_upload(self, checksums) -> object:
+        return asset.check_bulk_upload(self.parent_client, checksums)
+
+    async def check_bulk_upload_async(self, checksums) -> object:
+        return await self.parent_client.run_in_executor(asset.check_bulk_upload, self.parent_client, checksums)
+
+    def upload_asset(self, path, device_id=asset.UPLOAD_DEVICE_ID, checksum=None) -> object:
+        return asset.upload_asset(self.parent_client, path, device_id, checksum)
+
+    async def upload_asset_async(self, path, device_id=asset.UPLOAD_DEVICE_ID, checksum=None) -> object:
+        return await self.parent_client.run_in_executor(asset.upload_asset, self.parent_client, path, device_id,
+                                                        checksum)
+
+    def upload_assets(self, paths, device_id=asset.UPLOAD_DEVICE_ID, max_workers=4, hash_workers=None,
+                      check_duplicates: bool = True, batch_size=asset.UPLOAD_CHECK_BATCH_SIZE,
+                      progress_callback=None) -> dict:
+        return asset.upload_assets(self.parent_client, paths, device_id, max_workers, hash_workers, check_duplicates,
+                                   batch_size, progress_callback)
+
+    async def upload_assets_async(self, paths, device_id=asset.UPLOAD_DEVICE_ID, max_workers=4, hash_workers=None,
+                                  check_duplicates: bool = True, batch_size=asset.UPLOAD_CHECK_BATCH_SIZE,
+                                  progress_callback=None) -> dict:
+        return await self.parent_client.run_in_executor(asset.upload_assets, self.parent_client, paths, device_id,
+                                                        max_workers, hash_workers, check_duplicates, batch_size,
+                                                        progress_callback)
+
+    def delete_assets(self, assets_ids, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                      retries=DEFAULT_BATCH_RETRIES) -> bool:
+        return asset.delete_assets(self.parent_client, assets_ids, batch_size, max_workers, retries)
+
+    async def delete_assets_async(self, assets_ids, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                                  retries=DEFAULT_BATCH_RETRIES) -> bool:
+        return await self.parent_client.run_in_executor(asset.delete_assets, self.parent_client, assets_ids,
+                                                        batch_size, max_workers, retries)
+
+    def bulk_delete_assets(self, assets_ids, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                           retries=DEFAULT_BATCH_RETRIES) -> dict:
+        return asset.bulk_delete_assets(self.parent_client, assets_ids, batch_size, max_workers, retries)
+
+    async def bulk_delete_assets_async(self, assets_ids, batch_size=DEFAULT_BATCH_SIZE,
+                                       max_workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_BATCH_RETRIES) -> dict:
+        return await self.parent_client.run_in_executor(asset.bulk_delete_assets, self.parent_client, assets_ids,
+                                                        batch_size, max_workers, retries)
+
+    def find_duplicates(self, users_ids=None, near_duplicates: bool = False,
+                        max_distance=dedupe.NEAR_DUPLICATE_DISTANCE, is_external: bool = False,
+                        max_workers=dedupe.DEDUPE_WORKERS, progress_callback=None) -> object:
+        return dedupe.find_duplicates(self.parent_client, users_ids, near_duplicates, max_distance, is_external,
+                                      max_workers, progress_callback)
+
+    async def find_duplicates_async(self, users_ids=None, near_duplicates: bool = False,
+                                    max_distance=dedupe.NEAR_DUPLICATE_DISTANCE, is_external: bool = False,
+                                    max_workers=dedupe.DEDUPE_WORKERS, progress_callback=None) -> object:
+        return await self.parent_client.run_in_executor(dedupe.find_duplicates, self.parent_client, users_ids,
+                                                        near_duplicates, max_distance, is_external, max_workers,
+                                                        progress_callback)
 
     def view_asset(self, asset_id) -> object:
         return asset.view_asset(self.parent_client, asset_id)
 
-    def run_asset_jobs(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL) -> bool:
-        return asset.run_asset_jobs(self.parent_client, assets_ids, asset_job)
+    async def view_asset_async(self, asset_id) -> object:
+        return await self.parent_client.run_in_executor(asset.view_asset, self.parent_client, asset_id)
+
+    def get_asset_thumbnail(self, asset_id, etag=None) -> object:
+        return asset.get_asset_thumbnail(self.parent_client, asset_id, etag)
+
+    async def get_asset_thumbnail_async(self, asset_id, etag=None) -> object:
+        return await self.parent_client.run_in_executor(asset.get_asset_thumbnail, self.parent_client, asset_id, etag)
+
+    def run_asset_jobs(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL,
+                       batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                       retries=DEFAULT_BATCH_RETRIES) -> bool:
+        return asset.run_asset_jobs(self.parent_client, assets_ids, asset_job, batch_size, max_workers, retries)
+
+    async def run_asset_jobs_async(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL,
+                                   batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                                   retries=DEFAULT_BATCH_RETRIES) -> bool:
+        return await self.parent_client.run_in_executor(asset.run_asset_jobs, self.parent_client, assets_ids,
+                                                        asset_job, batch_size, max_workers, retries)
+
+    def bulk_run_asset_jobs(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL,
+                            batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                            retries=DEFAULT_BATCH_RETRIES) -> dict:
+        return asset.bulk_run_asset_jobs(self.parent_client, assets_ids, asset_job, batch_size, max_workers,
+                                         retries)
+
+    async def bulk_run_asset_jobs_async(self, assets_ids, asset_job: AssetJob = AssetJob.REGENERATE_THUMBNAIL,
+                                        batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                                        retries=DEFAULT_BATCH_RETRIES) -> dict:
+        return await self.parent_client.run_in_executor(asset.bulk_run_asset_jobs, self.parent_client, assets_ids,
+                                                        asset_job, batch_size, max_workers, retries)
 
 
 class JobClient:
@@ -69,12 +298,33 @@ class JobClient:
     def get_all_jobs_status(self) -> object:
         return job.get_all_jobs_status(self.parent_client)
 
+    async def get_all_jobs_status_async(self) -> object:
+        return await self.parent_client.run_in_executor(job.get_all_jobs_status, self.parent_client)
+
     def get_job_status(self, job_name: JobName) -> object:
         return job.get_job_status(self.parent_client, job_name)
 
+    async def get_job_status_async(self, job_name: JobName) -> object:
+        return await self.parent_client.run_in_executor(job.get_job_status, self.parent_client, job_name)
+
     def send_job_command(self, job_command: JobName, force: bool = False) -> object:
         return job.send_job_command(self.parent_client, job_command, force)
 
+    async def send_job_command_async(self, job_command: JobName, force: bool = False) -> object:
+        return await self.parent_client.run_in_executor(job.send_job_command, self.parent_client, job_command, force)
+
+    def wait_for_jobs(self, job_names, until: JobWaitCondition = JobWaitCondition.IDLE, timeout=None,
+                      min_interval=job.DEFAULT_WAIT_MIN_INTERVAL, max_interval=job.DEFAULT_WAIT_MAX_INTERVAL,
+                      progress_callback=None) -> object:
+        return job.wait_for_jobs(self.parent_client, job_names, until, timeout, min_interval, max_interval,
+                                 progress_callback)
+
+    async def wait_for_jobs_async(self, job_names, until: JobWaitCondition = JobWaitCondition.IDLE, timeout=None,
+                                  min_interval=job.DEFAULT_WAIT_MIN_INTERVAL,
+                                  max_interval=job.DEFAULT_WAIT_MAX_INTERVAL, progress_callback=None) -> object:
+        return await job.wait_for_jobs_async(self.parent_client, job_names, until, timeout, min_interval,
+                                             max_interval, progress_callback)
+
 
 class LibraryClient:
     def __init__(self, parent_client):
@@ -83,9 +333,32 @@ class LibraryClient:
     def get_libraries(self, library_type: LibraryType = None) -> object:
         return library.get_libraries(self.parent_client, library_type)
 
+    async def get_libraries_async(self, library_type: LibraryType = None) -> object:
+        return await self.parent_client.run_in_executor(library.get_libraries, self.parent_client, library_type)
+
     def scan_library(self, library_id, refresh_all_files=None, refresh_modified_files=None) -> bool:
         return library.scan_library(self.parent_client, library_id, refresh_all_files, refresh_modified_files)
 
+    async def scan_library_async(self, library_id, refresh_all_files=None, refresh_modified_files=None) -> bool:
+        return await self.parent_client.run_in_executor(library.scan_library, self.parent_client, library_id,
+                                                        refresh_all_files, refresh_modified_files)
+
+    def scan_libraries(self, libraries_ids=None, refresh_all_files=None, refresh_modified_files=None,
+                       max_concurrent=library.DEFAULT_SCAN_CONCURRENCY,
+                       max_pending_jobs=library.DEFAULT_SCAN_MAX_PENDING_JOBS,
+                       poll_interval=library.DEFAULT_SCAN_POLL_INTERVAL, timeout=None, progress_callback=None) -> dict:
+        return library.scan_libraries(self.parent_client, libraries_ids, refresh_all_files, refresh_modified_files,
+                                      max_concurrent, max_pending_jobs, poll_interval, timeout, progress_callback)
+
+    async def scan_libraries_async(self, libraries_ids=None, refresh_all_files=None, refresh_modified_files=None,
+                                   max_concurrent=library.DEFAULT_SCAN_CONCURRENCY,
+                                   max_pending_jobs=library.DEFAULT_SCAN_MAX_PENDING_JOBS,
+                                   poll_interval=library.DEFAULT_SCAN_POLL_INTERVAL, timeout=None,
+                                   progress_callback=None) -> dict:
+        return await self.parent_client.run_in_executor(library.scan_libraries, self.parent_client, libraries_ids,
+                                                        refresh_all_files, refresh_modified_files, max_concurrent,
+                                                        max_pending_jobs, poll_interval, timeout, progress_callback)
+
 
 class UserClient:
     def __init__(self, parent_client):
@@ -94,29 +367,89 @@ class UserClient:
     def get_my_user(self) -> object:
         return user.get_my_user(self.parent_client)
 
+    async def get_my_user_async(self) -> object:
+        return await self.parent_client.run_in_executor(user.get_my_user, self.parent_client)
+
     def get_user(self, user_id) -> object:
         return user.get_user(self.parent_client, user_id)
 
+    async def get_user_async(self, user_id) -> object:
+        return await self.parent_client.run_in_executor(user.get_user, self.parent_client, user_id)
+
     def get_user_by_id(self, user_id) -> object:
         return user.get_user(self.parent_client, user_id)
 
+    async def get_user_by_id_async(self, user_id) -> object:
+        return await self.parent_client.run_in_executor(user.get_user, self.parent_client, user_id)
+
+    def get_users(self, users_ids, max_workers=DEFAULT_BATCH_WORKERS) -> dict:
+        return user.get_users(self.parent_client, users_ids, max_workers)
+
+    async def get_users_async(self, users_ids, max_workers=DEFAULT_BATCH_WORKERS) -> dict:
+        return await self.parent_client.run_in_executor(user.get_users, self.parent_client, users_ids, max_workers)
+
 
 class PymmichClient:
     """Interface class"""
     base_url: str
     api_key: str
     requests_kwargs: object
+    session: object
+    rate_limiter: TokenBucket | None
+    executor: ThreadPoolExecutor
+    cache: ResponseCache | None
+    album_index: AlbumIndex
+    typed_models: bool
+    trace: bool
+    metrics: MetricsRegistry | None
+    asset_info_flights: SingleFlight
 
     def __init__(
             self,
             base_url: str,
             api_key: str,
+            pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+            pool_block: bool = False,
+            max_workers: int = None,
+            cache: bool = False,
+            cache_ttls: dict = None,
+            cache_size: int = DEFAULT_CACHE_SIZE,
+            typed_models: bool = False,
+            trace: bool = False,
+            retries: int = DEFAULT_RETRIES,
+            backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+            backoff_max: float = DEFAULT_BACKOFF_MAX,
+            rate_limit: float = None,
+            rate_limit_burst: int = None,
+            metrics: bool = False,
+            single_flight: bool = True,
     ) -> None:
         """
         Constructor
 
         :param base_url: the root API URL of immich, e.g. https://immich.mydomain.com/
         :param api_key: the Immich API Key to use
+        :param pool_connections: the number of per-host connection pools to cache
+        :param pool_maxsize: the maximum number of keep-alive connections per host
+        :param pool_block: whether to wait for a free connection when the pool is exhausted
+        :param max_workers: the number of worker threads running the awaitable methods, defaults to pool_maxsize
+        :param cache: whether to cache the responses of the read-mostly endpoints (users, albums, libraries, jobs)
+        :param cache_ttls: the time to live in seconds per cached endpoint, e.g. {"albums": 60}
+        :param cache_size: the maximum number of cached responses
+        :param typed_models: whether to return users, albums, assets, libraries and jobs status as the read-only
+                             models of pymmich.models instead of plain dictionaries
+        :param trace: whether to dump the full response payloads in the debug log
+        :param retries: the maximum number of retries of a request failing on a connection error, a 429 or a 5xx
+                        status, only idempotent requests are retried
+        :param backoff_factor: the base delay in seconds of the exponential backoff between retries
+        :param backoff_max: the maximum delay in seconds between two retries
+        :param rate_limit: the maximum sustained number of requests per second sent to the server, unlimited if None
+        :param rate_limit_burst: the number of requests that can be sent at once, defaults to rate_limit
+        :param metrics: whether to aggregate the latency, bytes, retries and in-flight requests per endpoint along
+                        with the cache hit ratio, see pymmich.metrics.MetricsRegistry
+        :param single_flight: whether identical GET requests sent concurrently, e.g. by many tasks calling get_albums
+                              at once, are merged into a single request whose response is shared
         """
 
         self.base_url = base_url
@@ -128,6 +461,21 @@ class PymmichClient:
                 'Accept': 'application/json'
             }
         }
+        self.rate_limiter = TokenBucket(rate_limit, rate_limit_burst) if rate_limit else None
+        self.session = create_session(pool_connections, pool_maxsize, pool_block, retries, backoff_factor,
+                                      backoff_max, self.idempotent_post_urls(), self.rate_limiter,
+                                      single_flight)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or pool_maxsize, thread_name_prefix='pymmich')
+        self.cache = ResponseCache(cache_ttls, cache_size) if cache else None
+        self.album_index = AlbumIndex()
+        self.typed_models = typed_models
+        self.trace = trace
+        self.asset_info_flights = SingleFlight()
+
+        self.metrics = MetricsRegistry(self.cache, self.session.single_flight) if metrics else None
+        if self.metrics is not None:
+            self.session.metrics = self.metrics
+            self.add_request_hook(self.metrics.observe)
 
         self.album = AlbumClient(self)
         self.asset = AssetClient(self)
@@ -135,6 +483,42 @@ class PymmichClient:
         self.library = LibraryClient(self)
         self.user = UserClient(self)
 
+    def idempotent_post_urls(self) -> list:
+        """Returns the url prefixes of the read-only POST endpoints that are safe to retry"""
+        return [f'{self.base_url}/api/sync/', f'{self.base_url}/api/assets/bulk-upload-check']
+
+    def add_request_hook(self, hook) -> None:
+        """
+        Registers a function called with the event dictionary of every finished request, see
+        pymmich.instrumentation.emit_request_event
+
+        :param hook: the function to call
+        """
+        self.session.request_hooks.append(hook)
+
+    def remove_request_hook(self, hook) -> None:
+        self.session.request_hooks.remove(hook)
+
+    async def run_in_executor(self, func, *args, **kwargs) -> object:
+        """
+        Runs a blocking call on the client worker threads without stalling the running event loop
+
+        :param func: the function to run
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def close(self) -> None:
+        """Waits for the pending calls then closes the pooled connections"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> None:
+        self.close()
+
     async def __aenter__(self):
         return self
 
@@ -144,4 +528,5 @@ class PymmichClient:
             exc_value: BaseException | None,
             tb
     ) -> None:
-        pass
+        # Waiting for the pending calls would otherwise block the event loop
+        await asyncio.to_thread(self.close)
@@ -0,0 +1,191 @@
+import base64
+import logging
+import threading
+import time
+import uuid
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from pymmich import asset, user
+from pymmich.thumbhash import decode_thumbhashes
+
+DEDUPE_WORKERS = 4
+NEAR_DUPLICATE_DISTANCE = 0.05
+NEAR_DUPLICATE_SIZE = (16, 16)
+NEAR_DUPLICATE_BATCH_SIZE = 4096
+DEDUPE_PAGE_SIZE = 1000
+
+# Checksums are SHA-1 digests and asset ids are UUIDs, both are kept as raw bytes
+_DIGEST_SIZE = 20
+_ID_SIZE = 16
+
+
+def find_duplicates(self, users_ids=None, near_duplicates: bool = False, max_distance=NEAR_DUPLICATE_DISTANCE,
+                    is_external: bool = False, max_workers=DEDUPE_WORKERS, progress_callback=None) -> object:
+    if users_ids is None:
+        my_user = user.get_my_user(self)
+        if my_user is None:
+            return None
+        users_ids = [my_user['id']]
+    users_ids = list(dict.fromkeys(users_ids))
+    logging.debug(f"### Find duplicates of users {users_ids} with near_duplicates : {near_duplicates}, "
+                  f"max_distance : {max_distance} and max_workers : {max_workers}")
+
+    started_at = time.monotonic()
+    names = _Names()
+
+    # Every user is streamed by its own worker into compact columns, merged once all the streams are consumed
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-dedupe') as executor:
+        futures = [executor.submit(_scan_user, self, user_id, is_external, near_duplicates, names)
+                   for user_id in users_ids]
+        scans = []
+        for user_id, future in zip(users_ids, futures):
+            scans.append(future.result())
+            if progress_callback is not None:
+                progress_callback(user_id, len(scans[-1].ids) // _ID_SIZE if scans[-1] is not None else None)
+
+    # A partial stream would report missing assets as unique, the report is only built from complete scans
+    failed_users_ids = [user_id for user_id, scan in zip(users_ids, scans) if scan is None]
+    if failed_users_ids:
+        logging.error(f'Failed to find duplicates, the assets of users {failed_users_ids} could not be retrieved')
+        return None
+
+    digests = np.frombuffer(b''.join(scan.digests for scan in scans), dtype=f'V{_DIGEST_SIZE}')
+    ids = np.frombuffer(b''.join(scan.ids for scan in scans), dtype=f'V{_ID_SIZE}')
+    owners = np.concatenate([np.zeros(0, dtype=np.uint32)] +
+                            [np.frombuffer(scan.owners, dtype=np.uint32) for scan in scans])
+    libraries = np.concatenate([np.zeros(0, dtype=np.uint32)] +
+                               [np.frombuffer(scan.libraries, dtype=np.uint32) for scan in scans])
+
+    # An asset shared with several of the users is streamed once per user, it is only kept once
+    _, first_positions = np.unique(ids, return_index=True)
+    if len(first_positions) < len(ids):
+        kept = np.sort(first_positions)
+        digests, ids, owners, libraries = digests[kept], ids[kept], owners[kept], libraries[kept]
+
+    report = {
+        "assets": len(ids),
+        "duplicates": _group_by_checksum(digests, ids, owners, libraries, names.values()),
+        "near_duplicates": None,
+        "elapsed": 0.0
+    }
+
+    if near_duplicates:
+        candidates = {}
+        for scan in scans:
+            for duplicate_id, thumbhashes in scan.candidates.items():
+                candidates.setdefault(duplicate_id, {}).update(thumbhashes)
+        report["near_duplicates"] = _confirm_near_duplicates(candidates, max_distance)
+
+    report["elapsed"] = time.monotonic() - started_at
+    logging.debug(f"### Find duplicates done : {report['assets']} assets, {len(report['duplicates'])} duplicate "
+                  f"groups in {report['elapsed']:.1f}s")
+    return report
+
+
+class _Names:
+    """Thread-safe numbering of the owner and library ids, so that they are stored as integers"""
+
+    def __init__(self) -> None:
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, name) -> int:
+        index = self._indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.setdefault(name, len(self._indexes))
+        return index
+
+    def values(self) -> list:
+        with self._lock:
+            return sorted(self._indexes, key=self._indexes.get)
+
+
+class _Scan:
+    """Columns of the assets of one user: checksums, ids, owners and libraries, plus the near-duplicate candidates"""
+
+    def __init__(self) -> None:
+        self.digests = bytearray()
+        self.ids = bytearray()
+        self.owners = array('I')
+        self.libraries = array('I')
+        # Immich duplicate id -> asset id -> thumbhash
+        self.candidates = {}
+
+
+def _scan_user(self, user_id, is_external, near_duplicates, names) -> object:
+    scan = _Scan()
+    try:
+        for item in asset.iter_full_sync(self, user_id, limit=DEDUPE_PAGE_SIZE, is_external=is_external):
+            checksum = item.get('checksum')
+            if checksum is None:
+                continue
+            scan.digests += base64.b64decode(checksum)
+            scan.ids += uuid.UUID(item['id']).bytes
+            scan.owners.append(names.index(item.get('ownerId')))
+            scan.libraries.append(names.index(item.get('libraryId')))
+            if near_duplicates and item.get('duplicateId') is not None and item.get('thumbhash'):
+                scan.candidates.setdefault(item['duplicateId'], {})[item['id']] = item['thumbhash']
+    except asset.FullSyncError as exception:
+        logging.error(str(exception))
+        return None
+    return scan
+
+
+def _group_by_checksum(digests, ids, owners, libraries, names) -> list:
+    # Sorting brings the equal digests together, a group starts wherever the digest changes
+    order = np.argsort(digests, kind='stable')
+    sorted_digests = digests[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_digests[1:] != sorted_digests[:-1])))
+    counts = np.diff(np.append(starts, len(order)))
+
+    groups = []
+    for start, count in zip(starts[counts > 1], counts[counts > 1]):
+        positions = order[start:start + count]
+        groups.append({
+            "checksum": base64.b64encode(digests[positions[0]].tobytes()).decode(),
+            "assets_ids": [str(uuid.UUID(bytes=ids[position].tobytes())) for position in positions],
+            "owners_ids": sorted({names[index] for index in owners[positions]} - {None}),
+            "libraries_ids": sorted({names[index] for index in libraries[positions]} - {None})
+        })
+    groups.sort(key=lambda group: len(group["assets_ids"]), reverse=True)
+    return groups
+
+
+def _confirm_near_duplicates(candidates, max_distance) -> list:
+    # Groups are never split across batches, so that every member is decoded along with its reference
+    confirmed = []
+    batch, batch_groups = [], []
+    for duplicate_id, thumbhashes in candidates.items():
+        if len(thumbhashes) < 2:
+            continue
+        batch_groups.append((duplicate_id, len(batch), len(thumbhashes)))
+        batch.extend(thumbhashes.items())
+        if len(batch) >= NEAR_DUPLICATE_BATCH_SIZE:
+            confirmed.extend(_confirm_batch(batch, batch_groups, max_distance))
+            batch, batch_groups = [], []
+    if batch:
+        confirmed.extend(_confirm_batch(batch, batch_groups, max_distance))
+    return confirmed
+
+
+def _confirm_batch(batch, batch_groups, max_distance) -> list:
+    # Every member is compared with the first one of its group, on previews of the same size whatever the aspect ratio
+    images = decode_thumbhashes([thumbhash for _, thumbhash in batch], NEAR_DUPLICATE_SIZE)[..., :3]
+    references = np.concatenate([np.full(size, offset) for _, offset, size in batch_groups])
+    distances = np.abs(images.astype(np.int16) - images[references]).mean(axis=(1, 2, 3)) / 255
+
+    confirmed = []
+    for duplicate_id, offset, size in batch_groups:
+        members = [(batch[position][0], float(distances[position])) for position in range(offset, offset + size)
+                   if distances[position] <= max_distance]
+        if len(members) > 1:
+            confirmed.append({
+                "duplicate_id": duplicate_id,
+                "assets_ids": [asset_id for asset_id, _ in members],
+                "distances": dict(members)
+            })
+    return confirmed
@@ -0,0 +1,10 @@
+import logging
+from enum import StrEnum, unique
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@unique
+class JobWaitCondition(StrEnum):
+    IDLE = "idle"
+    ACTIVE = "active"
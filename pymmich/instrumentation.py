@@ -0,0 +1,68 @@
+import logging
+import re
+from urllib.parse import urlsplit
+
+_ID_SEGMENT = re.compile(r'/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(?=/|$)')
+
+
+def endpoint_of(url) -> str:
+    """
+    Returns the path of an url with the ids replaced by {id}, e.g. /api/assets/{id}/thumbnail
+    """
+    return _ID_SEGMENT.sub('/{id}', urlsplit(url).path)
+
+
+def body_size(body) -> int:
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def response_size(response, stream: bool = False) -> int:
+    # The body of a streamed response is not read yet, its announced size is used instead
+    if stream:
+        return int(response.headers.get('Content-Length') or 0)
+    return len(response.content)
+
+
+def retries_of(response) -> int:
+    retries = getattr(response.raw, 'retries', None)
+    return len(retries.history) if retries is not None else 0
+
+
+def emit_request_event(hooks, method, url, response, elapsed, bytes_in, bytes_out, error=None) -> None:
+    """
+    Sends the event of a finished request to the hooks and to the debug log
+
+    The event is a dictionary with the method, url, endpoint, status, elapsed (seconds, retries included), bytes_in,
+    bytes_out, retries and error of the request. For streamed responses, bytes_in is the announced Content-Length.
+    """
+    event = {
+        "method": method,
+        "url": url,
+        "endpoint": endpoint_of(url),
+        "status": response.status_code if response is not None else None,
+        "elapsed": elapsed,
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "retries": retries_of(response) if response is not None else 0,
+        "error": error
+    }
+
+    logging.debug("### %s %s -> %s in %.1f ms, %s bytes in, %s bytes out", method, event["endpoint"],
+                  event["status"] if error is None else repr(error), elapsed * 1000, bytes_in, bytes_out)
+
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            logging.exception(f"Request hook {hook} failed")
+
+
+def log_payload(client, message, payload) -> None:
+    """
+    Logs a full response payload, only when the client was created with trace=True
+    """
+    if client.trace:
+        logging.debug(message, payload)
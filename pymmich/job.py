@@ -1,43 +1,83 @@
+import asyncio
 import json
 import logging
+import time
 
 import requests
 
+from pymmich.cache import cached, invalidates
 from pymmich.enums.job_name import JobName
+from pymmich.enums.job_wait_condition import JobWaitCondition
+from pymmich.instrumentation import log_payload
+from pymmich.models import JobStatus, loads, to_model
 
 
+DEFAULT_WAIT_MIN_INTERVAL = 0.5
+DEFAULT_WAIT_MAX_INTERVAL = 10
+
+
+@cached("jobs")
 def get_all_jobs_status(self) -> object:
     logging.debug(f"### Get all jobs status")
 
-    url = f"{self.base_url}/api/jobs"
-
-    response = requests.get(url, **self.requests_kwargs, verify=True)
-
-    if response.status_code == 200:
-        logging.debug(f"### Response all jobs status : {response.json()}")
-        return response.json()
-    else:
-        logging.error(f'Failed to retrieve all jobs status with status code {response.status_code}')
-        logging.error(response.text)
-        return None
+    jobs_status = _get_jobs_status(self)
+    if jobs_status is not None:
+        return _to_jobs_status(self, jobs_status)
+    return None
 
 
 def get_job_status(self, job_name: JobName) -> object:
     logging.debug(f"### Get job '{job_name}' status ")
 
-    url = f"{self.base_url}/api/jobs"
-
-    response = requests.get(url, **self.requests_kwargs, verify=True)
-
-    if response.status_code == 200:
-        logging.debug(f"### Response job status : {response.json()}")
-        return response.json().get(job_name)
-    else:
-        logging.error(f"Failed to retrieve job {job_name} status with status code {response.status_code}")
-        logging.error(response.text)
-        return None
-
-
+    # The server only exposes the status of all the queues at once, the cached map is shared between the jobs
+    jobs_status = get_all_jobs_status(self)
+    if jobs_status is not None:
+        return jobs_status.get(job_name)
+    return None
+
+
+def wait_for_jobs(self, job_names, until: JobWaitCondition = JobWaitCondition.IDLE, timeout=None,
+                  min_interval=DEFAULT_WAIT_MIN_INTERVAL, max_interval=DEFAULT_WAIT_MAX_INTERVAL,
+                  progress_callback=None) -> object:
+    job_names = [JobName(job_name) for job_name in job_names]
+    until = JobWaitCondition(until)
+    logging.debug(f"### Wait for jobs {job_names} until {until} with timeout : {timeout}")
+
+    progress = _JobsProgress(job_names, until, min_interval, max_interval, progress_callback)
+    while True:
+        # Every watched queue is read from a single fresh status map per tick, bypassing the cache
+        jobs_status = _poll_jobs_status(self)
+        if progress.update(jobs_status):
+            return _to_jobs_status(self, {job_name: jobs_status.get(job_name, {}) for job_name in job_names})
+
+        interval = progress.next_interval(timeout)
+        if interval is None:
+            logging.error(f'Timed out after {timeout} seconds waiting for jobs {job_names} to be {until}')
+            return None
+        time.sleep(interval)
+
+
+async def wait_for_jobs_async(self, job_names, until: JobWaitCondition = JobWaitCondition.IDLE, timeout=None,
+                              min_interval=DEFAULT_WAIT_MIN_INTERVAL, max_interval=DEFAULT_WAIT_MAX_INTERVAL,
+                              progress_callback=None) -> object:
+    job_names = [JobName(job_name) for job_name in job_names]
+    until = JobWaitCondition(until)
+    logging.debug(f"### Wait asynchronously for jobs {job_names} until {until} with timeout : {timeout}")
+
+    progress = _JobsProgress(job_names, until, min_interval, max_interval, progress_callback)
+    while True:
+        jobs_status = await self.run_in_executor(_poll_jobs_status, self)
+        if progress.update(jobs_status):
+            return _to_jobs_status(self, {job_name: jobs_status.get(job_name, {}) for job_name in job_names})
+
+        interval = progress.next_interval(timeout)
+        if interval is None:
+            logging.error(f'Timed out after {timeout} seconds waiting for jobs {job_names} to be {until}')
+            return None
+        await asyncio.sleep(interval)
+
+
+@invalidates("jobs")
 def send_job_command(self, job_command: JobName, force: bool = False) -> object:
     logging.debug(f"### Send job command with job_command : {job_command}")
 
@@ -55,12 +95,138 @@ def send_job_command(self, job_command: JobName, force: bool = False) -> object:
     # Converts payload to JSON
     payload = json.dumps(payload)
 
-    response = requests.put(url, data=payload, **self.requests_kwargs, verify=True)
+    response = self.session.put(url, data=payload, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Send job command : {response.json()}")
-        return response.json()
+        job_status = loads(response.content)
+        log_payload(self, "### Send job command : %s", job_status)
+        return to_model(self, JobStatus, job_status)
     else:
         logging.error(f"Failed to send job command {job_command} with status code {response.status_code}")
         logging.error(response.text)
         return None
+
+
+def _get_jobs_status(self) -> object:
+    url = f"{self.base_url}/api/jobs"
+
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
+
+    if response.status_code == 200:
+        jobs_status = loads(response.content)
+        log_payload(self, "### Response all jobs status : %s", jobs_status)
+        return jobs_status
+    else:
+        logging.error(f'Failed to retrieve all jobs status with status code {response.status_code}')
+        logging.error(response.text)
+        return None
+
+
+def _poll_jobs_status(self) -> object:
+    # A connection reset or a timeout only fails its own tick, which backs the polling off like any failed read
+    try:
+        return _get_jobs_status(self)
+    except requests.RequestException as exception:
+        logging.error(f'Failed to retrieve all jobs status : {exception}')
+        return None
+
+
+class _JobsProgress:
+    """Tracks the counts of the watched queues between ticks, to report the progress and pace the polling"""
+
+    def __init__(self, job_names, until, min_interval, max_interval, progress_callback) -> None:
+        self.job_names = job_names
+        self.until = until
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.progress_callback = progress_callback
+        self.interval = min_interval
+        self.started_at = time.monotonic()
+        self.first_processed = None
+        self.last_counts = None
+        self.last_processed = None
+        self.last_pending = None
+        self.last_tick = None
+        self.rate = None
+        self.pending = 0
+
+    def update(self, jobs_status) -> bool:
+        """
+        Applies the status map of a tick and returns whether the wait condition is met
+        """
+        if jobs_status is None:
+            # The next tick tries again, the polling slows down meanwhile so that a failing server is not hammered
+            self.last_counts = None
+            self.interval = min(self.interval * 2, self.max_interval)
+            return False
+
+        now = time.monotonic()
+        watched = {job_name: jobs_status.get(job_name) or {} for job_name in self.job_names}
+        counts = {job_name: job_status.get('jobCounts') or {} for job_name, job_status in watched.items()}
+        self.pending = sum(JobStatus(job_status).pending for job_status in watched.values())
+        processed = sum(job_counts.get('completed', 0) + job_counts.get('failed', 0) for job_counts in counts.values())
+
+        changed = counts != self.last_counts
+        if self.first_processed is None:
+            self.first_processed = processed
+        elif self.last_processed is not None and now > self.last_tick:
+            # Throughput smoothed over the ticks, the pending decrease stands in for servers without completed counts
+            done = processed - self.last_processed
+            if done <= 0:
+                done = max(self.last_pending - self.pending, 0)
+            tick_rate = done / (now - self.last_tick)
+            self.rate = tick_rate if self.rate is None else 0.5 * self.rate + 0.5 * tick_rate
+
+        self.interval = self._adapt_interval(changed)
+        self.last_counts = counts
+        self.last_tick = now
+        self.last_processed = processed
+        self.last_pending = self.pending
+
+        if self.progress_callback is not None:
+            self.progress_callback({
+                "jobs": counts,
+                "pending": self.pending,
+                "processed": processed - self.first_processed,
+                "rate": self.rate,
+                "eta": self.eta(),
+                "elapsed": now - self.started_at
+            })
+
+        is_active = any(JobStatus(job_status).is_active for job_status in watched.values())
+        if self.until == JobWaitCondition.IDLE:
+            return self.pending == 0 and not is_active
+        return self.pending > 0 or is_active
+
+    def eta(self) -> object:
+        if self.pending == 0:
+            return 0.0
+        if not self.rate:
+            return None
+        return self.pending / self.rate
+
+    def next_interval(self, timeout) -> object:
+        """
+        Returns the delay before the next tick, or None once the timeout is reached
+        """
+        if timeout is None:
+            return self.interval
+        remaining = self.started_at + timeout - time.monotonic()
+        if remaining <= 0:
+            return None
+        return min(self.interval, remaining)
+
+    def _adapt_interval(self, changed) -> float:
+        if not changed:
+            # Nothing moved, the polling backs off
+            return min(self.interval * 1.5, self.max_interval)
+        # The queues move, polling at half the remaining time catches the end without hammering the server
+        eta = self.eta()
+        interval = eta / 2 if eta else self.min_interval
+        return max(self.min_interval, min(interval, self.max_interval))
+
+
+def _to_jobs_status(self, jobs_status) -> dict:
+    if not getattr(self, 'typed_models', False):
+        return jobs_status
+    return {job_name: JobStatus(job_status) for job_name, job_status in jobs_status.items()}
@@ -1,30 +1,61 @@
 import json
 import logging
+import time
 
 import requests
 
+from pymmich import job
+from pymmich.cache import cached, invalidates
+from pymmich.enums.job_name import JobName
 from pymmich.enums.library_type import LibraryType
+from pymmich.instrumentation import log_payload
+from pymmich.models import JobStatus, Library, loads, to_model
 
+DEFAULT_SCAN_CONCURRENCY = 2
+DEFAULT_SCAN_MAX_PENDING_JOBS = 1000
+DEFAULT_SCAN_POLL_INTERVAL = 2
+SCAN_FAILED = "scan_failed"
+SCAN_TIMEOUT = "timeout"
 
+
+@cached("libraries")
 def get_libraries(self, library_type: LibraryType = None) -> object:
     logging.debug(f"### Get libraries with library_type : {library_type}")
 
+    libraries = _get_libraries(self, library_type)
+    if libraries is not None:
+        return to_model(self, Library, libraries)
+    return None
+
+
+def _get_libraries(self, library_type) -> object:
     if not library_type:
         url = f'{self.base_url}/api/libraries'
     else:
         url = f'{self.base_url}/api/libraries?type={library_type.name}'
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response libraries : {response.json()}")
-        return response.json()
+        libraries = loads(response.content)
+        log_payload(self, "### Response libraries : %s", libraries)
+        return libraries
     else:
         logging.error(f'Failed to retrieve libraries {library_type} with status code {response.status_code}')
         logging.error(response.text)
         return None
 
 
+def _poll_libraries(self, library_type) -> object:
+    # A connection reset or a timeout only fails its own read, like any failed request
+    try:
+        return _get_libraries(self, library_type)
+    except requests.RequestException as exception:
+        logging.error(f'Failed to retrieve libraries {library_type} : {exception}')
+        return None
+
+
+@invalidates("libraries", "jobs")
 def scan_library(self, library_id, refresh_all_files=None, refresh_modified_files=None) -> bool:
     logging.debug(f"### Scan library with library_id : {library_id} and refresh_all_files : {refresh_all_files} "
                   f"and refresh_modified_files : {refresh_modified_files}")
@@ -43,7 +74,7 @@ def scan_library(self, library_id, refresh_all_files=None, refresh_modified_file
     # Converts payload to JSON
     payload = json.dumps(payload)
 
-    response = requests.post(url, data=payload, **self.requests_kwargs, verify=True)
+    response = self.session.post(url, data=payload, **self.requests_kwargs, verify=True)
 
     if response.status_code == 204:
         logging.debug(f"### Scan library done")
@@ -51,4 +82,77 @@ def scan_library(self, library_id, refresh_all_files=None, refresh_modified_file
     else:
         logging.error(f'Failed scanning library {library_id} with status code {response.status_code}')
         logging.error(response.text)
-        return False
\ No newline at end of file
+        return False
+
+
+def scan_libraries(self, libraries_ids=None, refresh_all_files=None, refresh_modified_files=None,
+                   max_concurrent=DEFAULT_SCAN_CONCURRENCY, max_pending_jobs=DEFAULT_SCAN_MAX_PENDING_JOBS,
+                   poll_interval=DEFAULT_SCAN_POLL_INTERVAL, timeout=None, progress_callback=None) -> dict:
+    if libraries_ids is None:
+        libraries = _poll_libraries(self, LibraryType.EXTERNAL)
+        if libraries is None:
+            return {}
+        libraries_ids = [library['id'] for library in libraries]
+    libraries_ids = list(dict.fromkeys(libraries_ids))
+    logging.debug(f"### Scan libraries {libraries_ids} with max_concurrent : {max_concurrent} and max_pending_jobs : "
+                  f"{max_pending_jobs}")
+
+    results = {}
+    queued = list(libraries_ids)
+    # Library id -> (refreshedAt before the scan, submission time)
+    running = {}
+    started_at = time.monotonic()
+
+    def finish(library_id, success, error, refreshed_at=None):
+        results[library_id] = {
+            "success": success,
+            "error": error,
+            "duration": time.monotonic() - running.pop(library_id)[1] if library_id in running else None,
+            "refreshed_at": refreshed_at
+        }
+        if progress_callback is not None:
+            progress_callback(library_id, results[library_id])
+
+    while queued or running:
+        # Failed reads, connection errors included, are retried on the next tick, nothing is decided meanwhile
+        libraries = _poll_libraries(self, None)
+        jobs_status = job._poll_jobs_status(self)
+
+        if libraries is not None and jobs_status is not None:
+            libraries = {library['id']: library for library in libraries}
+            library_job = JobStatus(jobs_status.get(JobName.LIBRARY) or {})
+            queue_idle = library_job.pending == 0 and not library_job.is_active
+
+            # A scan is over once the server refreshed the library, or once the library queue drained after it was sent
+            for library_id, (refreshed_at, _) in list(running.items()):
+                library = libraries.get(library_id)
+                if library is None:
+                    finish(library_id, False, SCAN_FAILED)
+                elif library.get('refreshedAt') != refreshed_at or queue_idle:
+                    finish(library_id, True, None, library.get('refreshedAt'))
+
+            # New scans are only sent while the library queue keeps up, so that the server is not flooded
+            while queued and len(running) < max_concurrent and library_job.pending < max_pending_jobs:
+                library_id = queued.pop(0)
+                refreshed_at = (libraries.get(library_id) or {}).get('refreshedAt')
+                try:
+                    submitted = scan_library(self, library_id, refresh_all_files, refresh_modified_files)
+                except requests.RequestException as exception:
+                    logging.error(f'Failed scanning library {library_id} : {exception}')
+                    submitted = False
+                if submitted:
+                    running[library_id] = (refreshed_at, time.monotonic())
+                else:
+                    finish(library_id, False, SCAN_FAILED)
+
+        if not queued and not running:
+            break
+        if timeout is not None and time.monotonic() - started_at >= timeout:
+            logging.error(f'Timed out after {timeout} seconds scanning libraries {queued + list(running)}')
+            for library_id in queued + list(running):
+                finish(library_id, False, SCAN_TIMEOUT)
+            break
+        time.sleep(poll_interval)
+
+    logging.debug(f"### Scan libraries done")
+    return {library_id: results[library_id] for library_id in libraries_ids}
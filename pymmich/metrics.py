@@ -0,0 +1,180 @@
+import bisect
+import threading
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class MetricsRegistry:
+    """
+    Aggregates the request events of a client into latency histograms and counters
+
+    The registry is fed by the request hooks and by the session for the in-flight requests, it is only created when
+    the client is built with metrics=True so that a client without metrics pays nothing.
+    """
+
+    def __init__(self, cache=None, single_flight=None, buckets=DEFAULT_LATENCY_BUCKETS) -> None:
+        """
+        Constructor
+
+        :param cache: the ResponseCache of the client, whose hits and misses are exported along with the requests
+        :param single_flight: the SingleFlight of the session, whose merged requests are exported as well
+        :param buckets: the upper bounds in seconds of the latency histogram buckets
+        """
+        self.cache = cache
+        self.single_flight = single_flight
+        self.buckets = tuple(sorted(buckets))
+        self.in_flight = 0
+        self._requests = {}
+        self._bytes = {}
+        self._retries = {}
+        self._lock = threading.Lock()
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, event) -> None:
+        """
+        Records a finished request, registered as a request hook of the client
+
+        :param event: the event dictionary of pymmich.instrumentation.emit_request_event
+        """
+        status = str(event["status"]) if event["error"] is None else "error"
+        request_key = (event["method"], event["endpoint"], status)
+        endpoint_key = (event["method"], event["endpoint"])
+        bucket = bisect.bisect_left(self.buckets, event["elapsed"])
+
+        with self._lock:
+            histogram = self._requests.get(request_key)
+            if histogram is None:
+                histogram = self._requests[request_key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bucket] += 1
+            histogram[1] += event["elapsed"]
+            histogram[2] += 1
+
+            transferred = self._bytes.setdefault(endpoint_key, [0, 0])
+            transferred[0] += event["bytes_in"]
+            transferred[1] += event["bytes_out"]
+
+            if event["retries"]:
+                self._retries[endpoint_key] = self._retries.get(endpoint_key, 0) + event["retries"]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._bytes.clear()
+            self._retries.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current metrics as plain dictionaries, the quantiles are estimated from the histogram buckets
+        """
+        with self._lock:
+            requests = {key: (list(histogram[0]), histogram[1], histogram[2]) for key, histogram in
+                        self._requests.items()}
+            transferred = {key: tuple(value) for key, value in self._bytes.items()}
+            retries = dict(self._retries)
+            in_flight = self.in_flight
+
+        return {
+            "requests": [{
+                "method": method,
+                "endpoint": endpoint,
+                "status": status,
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "p50": self._quantile(counts, count, 0.5),
+                "p99": self._quantile(counts, count, 0.99),
+                "buckets": dict(zip(self.buckets + (float('inf'),), _cumulate(counts)))
+            } for (method, endpoint, status), (counts, total, count) in sorted(requests.items())],
+            "endpoints": [{
+                "method": method,
+                "endpoint": endpoint,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "retries": retries.get((method, endpoint), 0)
+            } for (method, endpoint), (bytes_in, bytes_out) in sorted(transferred.items())],
+            "in_flight": in_flight,
+            "retries": sum(retries.values()),
+            "coalesced": self.single_flight.coalesced if self.single_flight is not None else 0,
+            "cache": self.cache.stats() if self.cache is not None else None
+        }
+
+    def to_prometheus(self, prefix: str = 'pymmich') -> str:
+        """
+        Returns the current metrics in the Prometheus text exposition format
+
+        :param prefix: the prefix of the metric names
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f'# HELP {prefix}_request_duration_seconds Duration of the requests to the Immich API, retries included',
+            f'# TYPE {prefix}_request_duration_seconds histogram'
+        ]
+        for request in snapshot["requests"]:
+            labels = _labels(method=request["method"], endpoint=request["endpoint"], status=request["status"])
+            for upper_bound, count in request["buckets"].items():
+                le = '+Inf' if upper_bound == float('inf') else repr(float(upper_bound))
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{{labels}}} {request["sum"]}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{{labels}}} {request["count"]}')
+
+        for name, key, description in (('received_bytes_total', 'bytes_in', 'Bytes received from the Immich API'),
+                                       ('sent_bytes_total', 'bytes_out', 'Bytes sent to the Immich API'),
+                                       ('retries_total', 'retries', 'Retries of the requests to the Immich API')):
+            lines.append(f'# HELP {prefix}_request_{name} {description}')
+            lines.append(f'# TYPE {prefix}_request_{name} counter')
+            for endpoint in snapshot["endpoints"]:
+                labels = _labels(method=endpoint["method"], endpoint=endpoint["endpoint"])
+                lines.append(f'{prefix}_request_{name}{{{labels}}} {endpoint[key]}')
+
+        lines.append(f'# HELP {prefix}_requests_in_flight Requests to the Immich API being sent')
+        lines.append(f'# TYPE {prefix}_requests_in_flight gauge')
+        lines.append(f'{prefix}_requests_in_flight {snapshot["in_flight"]}')
+
+        lines.append(f'# HELP {prefix}_coalesced_requests_total Requests served by an identical request in flight')
+        lines.append(f'# TYPE {prefix}_coalesced_requests_total counter')
+        lines.append(f'{prefix}_coalesced_requests_total {snapshot["coalesced"]}')
+
+        cache = snapshot["cache"]
+        if cache is not None:
+            lines.append(f'# HELP {prefix}_cache_requests_total Lookups of the response cache by result')
+            lines.append(f'# TYPE {prefix}_cache_requests_total counter')
+            lines.append(f'{prefix}_cache_requests_total{{result="hit"}} {cache["hits"]}')
+            lines.append(f'{prefix}_cache_requests_total{{result="miss"}} {cache["misses"]}')
+            lines.append(f'# HELP {prefix}_cache_hit_ratio Share of the response cache lookups served from the cache')
+            lines.append(f'# TYPE {prefix}_cache_hit_ratio gauge')
+            lines.append(f'{prefix}_cache_hit_ratio {cache["hit_ratio"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _quantile(self, counts, count, quantile) -> object:
+        # Upper bound of the bucket holding the quantile, a pessimistic estimate without interpolation
+        if not count:
+            return None
+        rank = quantile * count
+        for upper_bound, cumulated in zip(self.buckets + (float('inf'),), _cumulate(counts)):
+            if cumulated >= rank:
+                return upper_bound
+        return float('inf')
+
+
+def _cumulate(counts) -> list:
+    cumulated, total = [], 0
+    for count in counts:
+        total += count
+        cumulated.append(total)
+    return cumulated
+
+
+def _labels(**labels) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
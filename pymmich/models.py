@@ -0,0 +1,276 @@
+from abc import ABCMeta
+from collections.abc import Mapping
+import sys
+from datetime import datetime
+
+from pymmich.thumbhash import decode_thumbhash, thumbhash_to_image
+
+try:
+    # orjson is optional, it decodes and encodes faster and shares the key strings between objects
+    from orjson import dumps, loads
+except ImportError:
+    from json import dumps as _json_dumps, loads
+
+    def dumps(value) -> bytes:
+        return _json_dumps(value, separators=(',', ':')).encode()
+
+
+class _Field:
+    """Exposes a key of the raw response as a snake_case attribute, the raw value is kept in a slot of the model"""
+
+    def __init__(self, key, is_date: bool = False, shared: bool = False) -> None:
+        self.key = key
+        self.is_date = is_date
+        # The values repeated over many objects, such as the owner ids, are interned to be stored once
+        self.shared = shared
+        self.slot = None
+
+    @property
+    def slots(self) -> tuple:
+        return (self.slot,)
+
+    def store(self, instance, value) -> None:
+        setattr(instance, self.slot, sys.intern(value) if self.shared and isinstance(value, str) else value)
+
+    def raw(self, instance):
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            raise KeyError(self.key) from None
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot, None)
+        if self.is_date and value is not None:
+            return datetime.fromisoformat(value)
+        return value
+
+
+class _Nested(_Field):
+    """
+    Exposes a nested object of the raw response, kept encoded as JSON bytes until its first access
+
+    The attribute is decoded once and wrapped into models when a model is given, item access decodes a fresh copy of
+    the raw object every time.
+    """
+
+    def __init__(self, key, model=None, many: bool = False) -> None:
+        super().__init__(key)
+        self.model = model
+        self.many = many
+
+    @property
+    def slots(self) -> tuple:
+        return self.slot, f'{self.slot}_decoded'
+
+    def store(self, instance, value) -> None:
+        # orjson over-allocates its output buffer, the copy only keeps the encoded bytes
+        setattr(instance, self.slot, bytes(memoryview(dumps(value))) if value is not None else None)
+
+    def raw(self, instance):
+        value = super().raw(instance)
+        return loads(value) if value is not None else None
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, f'{self.slot}_decoded')
+        except AttributeError:
+            pass
+
+        value = getattr(instance, self.slot, None)
+        if value is not None:
+            value = loads(value)
+            if self.model is not None:
+                value = [self.model(item) for item in value] if self.many else self.model(value)
+        setattr(instance, f'{self.slot}_decoded', value)
+        return value
+
+
+class _ModelMeta(ABCMeta):
+    """Gives every field of a model its own slots, so that the models are built without any instance dictionary"""
+
+    def __new__(mcs, name, bases, namespace):
+        fields = {}
+        for attribute, value in namespace.items():
+            if isinstance(value, _Field):
+                value.slot = f'_{attribute}'
+                fields[value.key] = value
+        namespace['__slots__'] = tuple(namespace.get('__slots__', ())) + \
+            tuple(slot for field in fields.values() for slot in field.slots)
+        cls = super().__new__(mcs, name, bases, namespace)
+        cls._fields = {**getattr(cls, '_fields', {}), **fields}
+        return cls
+
+
+class Model(Mapping, metaclass=_ModelMeta):
+    """
+    Read-only typed view over a raw response object
+
+    Models keep behaving as the raw dictionaries (item access, get, keys, ...). The known keys are kept in slots
+    instead of a dictionary, the nested objects (exif info, people, album assets, ...) are kept as compact JSON bytes
+    and only decoded on first access. The keys unknown to the model are kept in a dictionary.
+    """
+    __slots__ = ('_extra',)
+
+    def __init__(self, data: dict) -> None:
+        extra = {}
+        fields = self._fields
+        for key, value in data.items():
+            field = fields.get(key)
+            if field is None:
+                extra[key] = value
+            else:
+                field.store(self, value)
+        self._extra = extra or None
+
+    def __getitem__(self, key):
+        field = self._fields.get(key)
+        if field is not None:
+            return field.raw(self)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __iter__(self):
+        for key, field in self._fields.items():
+            if hasattr(self, field.slot):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.get('id')!r})"
+
+
+class User(Model):
+    id = _Field('id')
+    name = _Field('name')
+    email = _Field('email')
+    is_admin = _Field('isAdmin')
+    profile_image_path = _Field('profileImagePath')
+    avatar_color = _Field('avatarColor')
+    created_at = _Field('createdAt', is_date=True)
+    updated_at = _Field('updatedAt', is_date=True)
+
+
+class Asset(Model):
+    id = _Field('id')
+    device_asset_id = _Field('deviceAssetId')
+    type = _Field('type', shared=True)
+    owner_id = _Field('ownerId', shared=True)
+    device_id = _Field('deviceId', shared=True)
+    library_id = _Field('libraryId', shared=True)
+    original_path = _Field('originalPath')
+    original_file_name = _Field('originalFileName')
+    original_mime_type = _Field('originalMimeType', shared=True)
+    checksum = _Field('checksum')
+    thumbhash = _Field('thumbhash')
+    duplicate_id = _Field('duplicateId')
+    live_photo_video_id = _Field('livePhotoVideoId')
+    stack_parent_id = _Field('stackParentId')
+    duration = _Field('duration', shared=True)
+    resized = _Field('resized')
+    has_metadata = _Field('hasMetadata')
+    is_favorite = _Field('isFavorite')
+    is_archived = _Field('isArchived')
+    is_trashed = _Field('isTrashed')
+    is_offline = _Field('isOffline')
+    is_external = _Field('isExternal')
+    file_created_at = _Field('fileCreatedAt', is_date=True)
+    file_modified_at = _Field('fileModifiedAt', is_date=True)
+    local_date_time = _Field('localDateTime', is_date=True)
+    updated_at = _Field('updatedAt', is_date=True)
+    exif_info = _Nested('exifInfo')
+    tags = _Nested('tags')
+    owner = _Nested('owner', User)
+    people = _Nested('people', Model, many=True)
+
+    def thumbhash_rgba(self, size: tuple = None) -> object:
+        """
+        Decodes the thumbhash locally into an RGBA array of shape (height, width, 4), None without thumbhash
+
+        :param size: the (width, height) of the output, defaults to the aspect ratio of the thumbhash within 32x32
+        """
+        thumbhash = self.thumbhash
+        return decode_thumbhash(thumbhash, size) if thumbhash else None
+
+    def thumbhash_image(self, size: tuple = None) -> object:
+        """
+        Decodes the thumbhash locally into a small RGBA PIL image, None without thumbhash
+
+        :param size: the (width, height) of the image, defaults to the aspect ratio of the thumbhash within 32x32
+        """
+        thumbhash = self.thumbhash
+        return thumbhash_to_image(thumbhash, size) if thumbhash else None
+
+
+class Album(Model):
+    id = _Field('id')
+    album_name = _Field('albumName')
+    description = _Field('description')
+    owner_id = _Field('ownerId', shared=True)
+    album_thumbnail_asset_id = _Field('albumThumbnailAssetId')
+    asset_count = _Field('assetCount')
+    shared = _Field('shared')
+    has_shared_link = _Field('hasSharedLink')
+    is_activity_enabled = _Field('isActivityEnabled')
+    order = _Field('order')
+    created_at = _Field('createdAt', is_date=True)
+    updated_at = _Field('updatedAt', is_date=True)
+    start_date = _Field('startDate', is_date=True)
+    end_date = _Field('endDate', is_date=True)
+    last_modified_asset_timestamp = _Field('lastModifiedAssetTimestamp', is_date=True)
+    album_users = _Nested('albumUsers')
+    owner = _Nested('owner', User)
+    assets = _Nested('assets', Asset, many=True)
+
+
+class Library(Model):
+    id = _Field('id')
+    name = _Field('name')
+    type = _Field('type', shared=True)
+    owner_id = _Field('ownerId', shared=True)
+    asset_count = _Field('assetCount')
+    created_at = _Field('createdAt', is_date=True)
+    updated_at = _Field('updatedAt', is_date=True)
+    refreshed_at = _Field('refreshedAt', is_date=True)
+    import_paths = _Field('importPaths')
+    exclusion_patterns = _Field('exclusionPatterns')
+
+
+class JobStatus(Model):
+    job_counts = _Field('jobCounts')
+    queue_status = _Field('queueStatus')
+
+    @property
+    def is_active(self) -> bool:
+        return bool((self.queue_status or {}).get('isActive'))
+
+    @property
+    def pending(self) -> int:
+        job_counts = self.job_counts or {}
+        return sum(job_counts.get(key, 0) for key in ('active', 'waiting', 'delayed'))
+
+    def __repr__(self) -> str:
+        return f"JobStatus(job_counts={self.job_counts!r})"
+
+
+def to_model(client, model, data):
+    """
+    Wraps a decoded response into models when the client was created with typed_models=True
+
+    :param client: the PymmichClient
+    :param model: the model class of a single item
+    :param data: a decoded object or a list of decoded objects
+    """
+    if data is None or not getattr(client, 'typed_models', False):
+        return data
+    if isinstance(data, list):
+        return [model(item) for item in data]
+    return model(data)
@@ -0,0 +1,88 @@
+import os
+import uuid
+
+MULTIPART_BLOCK_SIZE = 1024 * 1024
+
+
+class MultipartBody:
+    """
+    multipart/form-data body streamed from the disk, the files are only read while the request is sent
+
+    The body is a file-like object with a length, so that requests sends it with a Content-Length header instead of
+    loading it into memory or using a chunked transfer encoding.
+    """
+
+    def __init__(self, fields: dict, files: dict, block_size: int = MULTIPART_BLOCK_SIZE) -> None:
+        """
+        Constructor
+
+        :param fields: the text fields, name -> value
+        :param files: the file fields, name -> (file name, path, content type)
+        :param block_size: the size of the blocks read from the files
+        """
+        self.boundary = uuid.uuid4().hex
+        self.block_size = block_size
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+
+        # Parts are either bytes or the path of a file
+        self._parts = []
+        for name, value in fields.items():
+            self._parts.append(self._part_header(name) + f'\r\n\r\n{value}\r\n'.encode())
+        for name, (file_name, path, content_type) in files.items():
+            self._parts.append(self._part_header(name) + f'; filename="{_quote(file_name)}"\r\n'
+                                                         f'Content-Type: {content_type}\r\n\r\n'.encode())
+            self._parts.append(path)
+            self._parts.append(b'\r\n')
+        self._parts.append(f'--{self.boundary}--\r\n'.encode())
+
+        self._length = sum(len(part) if isinstance(part, bytes) else os.path.getsize(part) for part in self._parts)
+        self._index = 0
+        self._file = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        return iter(lambda: self.read(self.block_size), b'')
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        while self._index < len(self._parts) and (size < 0 or size > 0):
+            part = self._parts[self._index]
+            if isinstance(part, bytes):
+                chunk = part if size < 0 else part[:size]
+                remaining = part[len(chunk):]
+                if remaining:
+                    self._parts[self._index] = remaining
+                else:
+                    self._index += 1
+            else:
+                if self._file is None:
+                    self._file = open(part, 'rb')
+                chunk = self._file.read(size)
+                if size < 0 or len(chunk) < size:
+                    self._file.close()
+                    self._file = None
+                    self._index += 1
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b''.join(chunks)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _part_header(self, name) -> bytes:
+        return f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"'.encode()
+
+
+def _quote(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\r', ' ').replace('\n', ' ')
@@ -0,0 +1,40 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the rate of the requests sent to the server"""
+
+    def __init__(self, rate: float, burst: int = None) -> None:
+        """
+        Constructor
+
+        :param rate: the sustained number of requests per second
+        :param burst: the number of requests that can be sent at once after an idle period, defaults to rate
+        """
+        if rate <= 0:
+            raise ValueError(f"The rate parameter '{rate}' must be strictly positive")
+
+        self.rate = rate
+        self.capacity = max(1, int(burst if burst is not None else rate))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes a token, waiting for one to be available when the bucket is empty
+
+        :return: the time waited in seconds
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            # The token is reserved now, callers arriving later wait behind it
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
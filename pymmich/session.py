@@ -0,0 +1,135 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from pymmich.instrumentation import emit_request_event, body_size, response_size
+from pymmich.single_flight import SingleFlight
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_BACKOFF_MAX = 30
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+class PymmichSession(requests.Session):
+    """
+    Session rate limiting and timing every request for the request hooks, the metrics and the debug log
+
+    With a single_flight, identical GET requests sent while one of them is in flight are not sent again, they all get
+    the response of the first one.
+    """
+
+    def __init__(self, rate_limiter=None, single_flight: SingleFlight = None) -> None:
+        super().__init__()
+        self.request_hooks = []
+        self.rate_limiter = rate_limiter
+        self.single_flight = single_flight
+        self.metrics = None
+
+    def request(self, method, url, *args, **kwargs):
+        if self.single_flight is not None and method == 'GET' and not args:
+            key = _single_flight_key(url, kwargs)
+            if key is not None:
+                return self.single_flight.do(key, self._send_request, method, url, **kwargs)
+        return self._send_request(method, url, *args, **kwargs)
+
+    def _send_request(self, method, url, *args, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        # Nothing is measured when nobody listens
+        if not self.request_hooks and not logging.getLogger().isEnabledFor(logging.DEBUG):
+            return super().request(method, url, *args, **kwargs)
+
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.request_started()
+
+        bytes_out = body_size(kwargs.get('data'))
+        started_at = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException as exception:
+            emit_request_event(self.request_hooks, method, url, None, time.perf_counter() - started_at, 0, bytes_out,
+                               exception)
+            raise
+        finally:
+            if metrics is not None:
+                metrics.request_finished()
+
+        elapsed = time.perf_counter() - started_at
+        emit_request_event(self.request_hooks, method, url, response, elapsed,
+                           response_size(response, kwargs.get('stream', False)), bytes_out)
+        return response
+
+
+def _single_flight_key(url, kwargs) -> object:
+    # Streamed responses are read by their caller and cannot be shared, neither can requests with a body
+    if kwargs.get('stream') or kwargs.get('data') is not None or kwargs.get('json') is not None \
+            or kwargs.get('files') is not None:
+        return None
+    key = (url, tuple(sorted((name, _freeze(value)) for name, value in kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _freeze(value) -> object:
+    if isinstance(value, dict):
+        return tuple(sorted((name, _freeze(item)) for name, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def create_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                   pool_block: bool = False, retries: int = DEFAULT_RETRIES,
+                   backoff_factor: float = DEFAULT_BACKOFF_FACTOR, backoff_max: float = DEFAULT_BACKOFF_MAX,
+                   idempotent_post_urls=(), rate_limiter=None, single_flight: bool = True) -> PymmichSession:
+    """
+    Creates the HTTP session shared by every sub-client
+
+    Connections are kept alive and reused between calls instead of opening a new TCP+TLS connection per request.
+    Requests failing on a connection error, a 429 or a 5xx status are retried with an exponential backoff with jitter,
+    honoring the Retry-After header. Only idempotent methods are retried once sent, POST requests are only retried for
+    the read-only endpoints of idempotent_post_urls.
+
+    :param pool_connections: the number of per-host connection pools to cache
+    :param pool_maxsize: the maximum number of connections kept alive per host
+    :param pool_block: whether to wait for a free connection instead of opening an extra one when the pool is full
+    :param retries: the maximum number of retries of a request, 0 disables the retries
+    :param backoff_factor: the base delay in seconds of the exponential backoff, also used as the maximum jitter
+    :param backoff_max: the maximum delay in seconds between two retries
+    :param idempotent_post_urls: the url prefixes of the POST endpoints that are safe to retry
+    :param rate_limiter: an optional TokenBucket every request waits on before being sent
+    :param single_flight: whether identical concurrent GET requests are merged into a single request
+    """
+    session = PymmichSession(rate_limiter, SingleFlight() if single_flight else None)
+
+    def create_adapter(allowed_methods):
+        retry = Retry(total=retries, status_forcelist=RETRY_STATUSES, allowed_methods=allowed_methods,
+                      backoff_factor=backoff_factor, backoff_jitter=backoff_factor, backoff_max=backoff_max,
+                      respect_retry_after_header=True, raise_on_status=False)
+        return HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block,
+                           max_retries=retry)
+
+    adapter = create_adapter(IDEMPOTENT_METHODS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    # requests picks the adapter with the longest matching prefix
+    if idempotent_post_urls:
+        post_adapter = create_adapter(IDEMPOTENT_METHODS | {'POST'})
+        for url in idempotent_post_urls:
+            session.mount(url, post_adapter)
+
+    return session
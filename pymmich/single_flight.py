@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Merges the concurrent calls sharing a key into a single call
+
+    The first caller of a key runs the call, the callers arriving while it is in flight wait for it and get the same
+    result, or the same exception. Nothing is kept once the call is done, this is not a cache.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs) -> object:
+        """
+        Runs func unless a call with the same key is already in flight, in which case its result is returned
+
+        :param key: the hashable key identifying identical calls
+        :param func: the function to call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exception:
+            self._done(key)
+            future.set_exception(exception)
+            raise
+        self._done(key)
+        future.set_result(result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def _done(self, key) -> None:
+        # The key is released before the waiters are woken up, so that a later call is never served a stale result
+        with self._lock:
+            del self._calls[key]
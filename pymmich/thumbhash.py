@@ -0,0 +1,164 @@
+import base64
+import math
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+# Largest number of coefficients per axis of a channel (luminance of an opaque landscape or portrait image)
+_MAX_COEFFICIENTS = 7
+_CHANNELS = 4
+
+
+class _Header:
+    """Decoded header and AC coefficients of a thumbhash"""
+
+    __slots__ = ('dc', 'coefficients', 'has_alpha', 'ratio')
+
+    def __init__(self, thumbhash) -> None:
+        thumbhash = _to_bytes(thumbhash)
+        header24 = thumbhash[0] | (thumbhash[1] << 8) | (thumbhash[2] << 16)
+        header16 = thumbhash[3] | (thumbhash[4] << 8)
+
+        l_dc = (header24 & 63) / 63
+        p_dc = ((header24 >> 6) & 63) / 31.5 - 1
+        q_dc = ((header24 >> 12) & 63) / 31.5 - 1
+        l_scale = ((header24 >> 18) & 31) / 31
+        self.has_alpha = bool(header24 >> 23)
+        p_scale = ((header16 >> 3) & 63) / 63
+        q_scale = ((header16 >> 9) & 63) / 63
+        is_landscape = bool(header16 >> 15)
+
+        lx = max(3, (5 if self.has_alpha else 7) if is_landscape else header16 & 7)
+        ly = max(3, header16 & 7 if is_landscape else (5 if self.has_alpha else 7))
+        a_dc = (thumbhash[5] & 15) / 15 if self.has_alpha else 1.0
+        a_scale = (thumbhash[5] >> 4) / 15
+
+        # Approximate aspect ratio, computed from the raw header as the reference implementation does, a degenerate
+        # header with a zero count is clamped so that it cannot fail a whole batch
+        self.ratio = ((5 if self.has_alpha else 7) if is_landscape else max(1, header16 & 7)) / \
+            (max(1, header16 & 7) if is_landscape else (5 if self.has_alpha else 7))
+
+        self.dc = np.array([l_dc, p_dc, q_dc, a_dc])
+
+        # AC coefficients of the L, P, Q and A channels laid out on a (channel, cy, cx) grid, zero elsewhere
+        self.coefficients = np.zeros((_CHANNELS, _MAX_COEFFICIENTS, _MAX_COEFFICIENTS))
+        nibbles = np.frombuffer(thumbhash, dtype=np.uint8, offset=6 if self.has_alpha else 5)
+        nibbles = np.stack((nibbles & 15, nibbles >> 4), axis=1).ravel() / 7.5 - 1
+
+        start = 0
+        channels = [(lx, ly, l_scale), (3, 3, p_scale * 1.25), (3, 3, q_scale * 1.25)]
+        if self.has_alpha:
+            channels.append((5, 5, a_scale))
+        for channel, (nx, ny, scale) in enumerate(channels):
+            cy, cx = _triangle(nx, ny)
+            values = nibbles[start:start + len(cx)]
+            self.coefficients[channel, cy[:len(values)], cx[:len(values)]] = values * scale
+            start += len(cx)
+
+    def size(self) -> tuple:
+        if self.ratio > 1:
+            return 32, round(32 / self.ratio)
+        return round(32 * self.ratio), 32
+
+
+def _to_bytes(thumbhash) -> bytes:
+    if isinstance(thumbhash, str):
+        return base64.b64decode(thumbhash)
+    return bytes(thumbhash)
+
+
+@lru_cache(maxsize=None)
+def _triangle(nx, ny) -> tuple:
+    """Returns the (cy, cx) positions of the AC coefficients of a channel, in their encoding order"""
+    positions = [(cy, cx) for cy in range(ny) for cx in range(0 if cy else 1, nx) if cx * ny < nx * (ny - cy)]
+    cy, cx = zip(*positions)
+    return np.array(cy), np.array(cx)
+
+
+@lru_cache(maxsize=64)
+def _basis(length) -> np.ndarray:
+    """Cosine basis of shape (coefficient, pixel) for an axis of the given length"""
+    pixels = (np.arange(length) + 0.5) * (math.pi / length)
+    return np.cos(np.outer(np.arange(_MAX_COEFFICIENTS), pixels)).astype(np.float32)
+
+
+def _render(headers, width, height) -> np.ndarray:
+    """Renders thumbhashes sharing the same output size, returns an array of shape (n, height, width, 4)"""
+    dc = np.array([header.dc for header in headers], dtype=np.float32)
+    coefficients = np.array([header.coefficients for header in headers], dtype=np.float32)
+
+    # channel[y, x] = dc + sum over (cy, cx) of ac[cy, cx] * cos(x) * 2 cos(y), for every hash and channel at once
+    lpqa = np.einsum('yc,nkcd,dx->nyxk', 2 * _basis(height).T, coefficients, _basis(width), optimize=True)
+    lpqa += dc[:, None, None, :]
+
+    # LPQA to RGBA, in place: b = l - 2/3 p, r = (3 l - b + q) / 2, g = r - q
+    l, p, q = lpqa[..., 0], lpqa[..., 1], lpqa[..., 2]
+    b = l - 2 / 3 * p
+    r = (3 * l - b + q) / 2
+    lpqa[..., 0] = r
+    lpqa[..., 1] = r - q
+    lpqa[..., 2] = b
+    np.clip(lpqa, 0, 1, out=lpqa)
+    lpqa *= 255
+    return lpqa.astype(np.uint8)
+
+
+def decode_thumbhash(thumbhash, size: tuple = None) -> np.ndarray:
+    """
+    Decodes a thumbhash into an RGBA array of shape (height, width, 4)
+
+    :param thumbhash: the thumbhash, base64 encoded as in the asset responses or raw bytes
+    :param size: the (width, height) of the output, defaults to the aspect ratio of the thumbhash within 32x32
+    """
+    header = _Header(thumbhash)
+    width, height = size or header.size()
+    return _render([header], width, height)[0]
+
+
+def decode_thumbhashes(thumbhashes, size: tuple = None) -> object:
+    """
+    Decodes many thumbhashes at once, the hashes sharing the same output size are rendered in a single pass
+
+    :param thumbhashes: the thumbhashes, base64 encoded or raw bytes
+    :param size: the (width, height) of every output, an array of shape (n, height, width, 4) is then returned
+                 instead of a list of arrays of shape (height, width, 4)
+    """
+    headers = [_Header(thumbhash) for thumbhash in thumbhashes]
+    if size is not None:
+        width, height = size
+        if not headers:
+            return np.zeros((0, height, width, _CHANNELS), dtype=np.uint8)
+        return _render(headers, width, height)
+
+    groups = {}
+    for position, header in enumerate(headers):
+        groups.setdefault(header.size(), []).append(position)
+
+    images = [None] * len(headers)
+    for (width, height), positions in groups.items():
+        for position, image in zip(positions, _render([headers[position] for position in positions], width, height)):
+            images[position] = image
+    return images
+
+
+def decode_assets_thumbhashes(assets, size: tuple = None) -> dict:
+    """
+    Decodes the thumbhashes of many assets at once, the assets without a thumbhash are left out
+
+    :param assets: the assets, as dictionaries or models
+    :param size: the (width, height) of every output, defaults to the aspect ratio of each thumbhash within 32x32
+    """
+    assets = [asset for asset in assets if asset.get('thumbhash')]
+    images = decode_thumbhashes([asset['thumbhash'] for asset in assets], size)
+    return {asset['id']: image for asset, image in zip(assets, images)}
+
+
+def thumbhash_to_image(thumbhash, size: tuple = None) -> Image.Image:
+    """
+    Decodes a thumbhash into an RGBA PIL image
+
+    :param thumbhash: the thumbhash, base64 encoded as in the asset responses or raw bytes
+    :param size: the (width, height) of the image, defaults to the aspect ratio of the thumbhash within 32x32
+    """
+    return Image.fromarray(decode_thumbhash(thumbhash, size))
@@ -0,0 +1,195 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pymmich import asset
+
+DEFAULT_THUMBNAIL_CACHE_SIZE = 512 * 1024 * 1024
+DEFAULT_PREFETCH_WORKERS = 8
+
+
+class ThumbnailCache:
+    """On-disk cache of the asset thumbnails, keyed by asset id and thumbhash"""
+
+    def __init__(self, client, directory, max_bytes: int = DEFAULT_THUMBNAIL_CACHE_SIZE,
+                 revalidate: bool = False) -> None:
+        """
+        Constructor
+
+        :param client: the PymmichClient used to fetch the missing thumbnails
+        :param directory: the cache directory, created if needed
+        :param max_bytes: the size budget of the cache, the least recently used thumbnails are evicted beyond it
+        :param revalidate: whether to revalidate every hit with the server using its ETag, hits without a known
+                           thumbhash are always revalidated since their key cannot change with the thumbnail
+        """
+        self.client = client
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        # Asset id -> paths of its cached versions, so that a store never lists the whole directory
+        self._versions = {}
+        self._size = 0
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.thumb'):
+                self._versions.setdefault(entry.name.rsplit('-', 1)[0], set()).add(entry.path)
+                self._size += entry.stat().st_size
+
+    def get(self, asset_id, thumbhash=None) -> object:
+        """
+        Returns the thumbnail bytes of an asset, from the disk when cached
+
+        :param asset_id: the asset id
+        :param thumbhash: the asset thumbhash, a new thumbhash means a new thumbnail
+        :return: the thumbnail bytes, or None when it could not be fetched
+        """
+        path = self._path(asset_id, thumbhash)
+
+        if os.path.isfile(path):
+            if not self.revalidate and thumbhash is not None:
+                return self._read_hit(path)
+
+            thumbnail = asset.get_asset_thumbnail(self.client, asset_id, self._read_etag(path))
+            if thumbnail is not None and thumbnail['not_modified']:
+                return self._read_hit(path)
+        else:
+            thumbnail = asset.get_asset_thumbnail(self.client, asset_id)
+
+        with self._lock:
+            self.misses += 1
+
+        if thumbnail is None:
+            return None
+
+        self._store(asset_id, path, thumbnail['content'], thumbnail['etag'])
+        return thumbnail['content']
+
+    def prefetch(self, assets, max_workers: int = DEFAULT_PREFETCH_WORKERS) -> dict:
+        """
+        Fetches concurrently the thumbnails missing from the cache
+
+        :param assets: asset ids, or asset dictionaries whose thumbhash is then used in the key
+        :param max_workers: the maximum number of thumbnails fetched at the same time
+        :return: a dict of asset id -> whether the thumbnail is now cached
+        """
+        assets = [(item, None) if isinstance(item, str) else (item['id'], item.get('thumbhash')) for item in assets]
+        logging.debug(f"### Prefetch {len(assets)} thumbnails with max_workers : {max_workers}")
+
+        def fetch(item):
+            asset_id, thumbhash = item
+            if os.path.isfile(self._path(asset_id, thumbhash)):
+                return True
+            return self.get(asset_id, thumbhash) is not None
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-thumbnail') as executor:
+            return dict(zip((asset_id for asset_id, _ in assets), executor.map(fetch, assets)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "size": self._size,
+                "max_size": self.max_bytes
+            }
+
+    def _path(self, asset_id, thumbhash) -> str:
+        version = hashlib.sha1((thumbhash or '').encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f'{asset_id}-{version}.thumb')
+
+    def _read_hit(self, path) -> object:
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+            # The modification time orders the least recently used thumbnails for the eviction
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another thread in the meantime
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return content
+
+    @staticmethod
+    def _read_etag(path) -> object:
+        try:
+            with open(f'{path}.etag', 'r') as file:
+                return file.read() or None
+        except FileNotFoundError:
+            return None
+
+    def _store(self, asset_id, path, content, etag) -> None:
+        # Older versions of the thumbnail are dropped
+        with self._lock:
+            older_paths = self._versions.get(asset_id, set()) - {path}
+        for older_path in older_paths:
+            self._remove(older_path)
+
+        temporary_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(content)
+        previous_size = os.path.getsize(path) if os.path.isfile(path) else 0
+        os.replace(temporary_path, path)
+
+        if etag is not None:
+            with open(f'{path}.etag', 'w') as file:
+                file.write(etag)
+
+        with self._lock:
+            self._versions.setdefault(asset_id, set()).add(path)
+            self._size += len(content) - previous_size
+            over_budget = self._size > self.max_bytes
+
+        if over_budget:
+            self._evict()
+
+    def _evict(self) -> None:
+        # A single thread evicts at a time, the others keep storing meanwhile
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.thumb'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:
+                        pass
+            entries.sort()
+            # Evicts down to 90% of the budget so that the next stores do not evict again right away
+            for _, path in entries:
+                with self._lock:
+                    if self._size <= self.max_bytes * 0.9:
+                        break
+                self._remove(path)
+        finally:
+            self._evict_lock.release()
+
+    def _remove(self, path) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        try:
+            os.remove(f'{path}.etag')
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._size -= size
+            asset_id = os.path.basename(path).rsplit('-', 1)[0]
+            versions = self._versions.get(asset_id)
+            if versions is not None:
+                versions.discard(path)
+                if not versions:
+                    del self._versions[asset_id]
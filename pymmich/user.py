@@ -1,35 +1,52 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+from pymmich.batch import DEFAULT_BATCH_WORKERS
+from pymmich.cache import cached
+from pymmich.instrumentation import log_payload
+from pymmich.models import User, loads, to_model
 
 
+@cached("user")
 def get_my_user(self) -> object:
     logging.debug(f"### Get my user")
 
     url = f'{self.base_url}/api/users/me'
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response user : {response.json()}")
-        return response.json()
+        user = loads(response.content)
+        log_payload(self, "### Response user : %s", user)
+        return to_model(self, User, user)
     else:
         logging.error(f'Failed to retrieve my user with status code {response.status_code}')
         logging.error(response.text)
         return None
 
 
+@cached("user")
 def get_user(self, user_id) -> object:
     logging.debug(f"### Get user with id : {user_id}")
 
     url = f'{self.base_url}/api/users/{user_id}'
 
-    response = requests.get(url, **self.requests_kwargs, verify=True)
+    response = self.session.get(url, **self.requests_kwargs, verify=True)
 
     if response.status_code == 200:
-        logging.debug(f"### Response user : {response.json()}")
-        return response.json()
+        user = loads(response.content)
+        log_payload(self, "### Response user : %s", user)
+        return to_model(self, User, user)
     else:
         logging.error(f'Failed to retrieve user with id {user_id} with status code {response.status_code}')
         logging.error(response.text)
         return None
+
+
+def get_users(self, users_ids, max_workers=DEFAULT_BATCH_WORKERS) -> dict:
+    # Each user is requested once, concurrently, and served from the user cache when it is enabled
+    users_ids = list(dict.fromkeys(users_ids))
+    logging.debug(f"### Get users with ids : {users_ids}")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pymmich-user') as executor:
+        return dict(zip(users_ids, executor.map(lambda user_id: get_user(self, user_id), users_ids)))
@@ -0,0 +1,285 @@
+"""
+Benchmarks of the sub-client methods against a local mock Immich server, no network needed
+
+Run the whole suite with a report:
+    PYTHONPATH=. python test/benchmark_pymmich_client.py --latency 0.005 --output bench.json
+Or as a smoke test in CI:
+    python -m pytest test/benchmark_pymmich_client.py
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+from datetime import datetime
+
+from mock_immich import MockImmich, USER_ID, LIBRARY_ID
+from pymmich.client import PymmichClient
+from pymmich.enums.asset_job import AssetJob
+from pymmich.enums.job_name import JobName
+
+
+class Benchmark:
+    """A named call of the client, measured over several iterations"""
+
+    def __init__(self, name, func, iterations: int = None) -> None:
+        """
+        Constructor
+
+        :param name: the name of the benchmark, usually the sub-client method
+        :param func: the measured function, called with the client and a temporary directory
+        :param iterations: the number of calls, overrides the iterations of the run
+        """
+        self.name = name
+        self.func = func
+        self.iterations = iterations
+
+    def run(self, client, directory, iterations: int) -> dict:
+        iterations = self.iterations or iterations
+        events = []
+        hook = events.append
+        client.add_request_hook(hook)
+        try:
+            # A first call warms the connections and the caches up, it is not measured
+            self.func(client, directory)
+            events.clear()
+
+            latencies = []
+            started_at = time.perf_counter()
+            for _ in range(iterations):
+                call_started_at = time.perf_counter()
+                self.func(client, directory)
+                latencies.append(time.perf_counter() - call_started_at)
+            elapsed = time.perf_counter() - started_at
+            timed_events = list(events)
+
+            # Memory is traced on a separate call, tracing slows the calls down too much to be timed
+            tracemalloc.start()
+            try:
+                self.func(client, directory)
+                peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        finally:
+            client.remove_request_hook(hook)
+
+        transferred = sum(event["bytes_in"] + event["bytes_out"] for event in timed_events)
+        return {
+            "name": self.name,
+            "calls": iterations,
+            "requests": len(timed_events),
+            "errors": sum(1 for event in timed_events if event["error"] is not None or event["status"] >= 400),
+            "requests_per_second": len(timed_events) / elapsed if elapsed else 0.0,
+            "p50": _percentile(latencies, 50),
+            "p99": _percentile(latencies, 99),
+            "bytes_per_second": transferred / elapsed if elapsed else 0.0,
+            "peak_memory": peak_memory
+        }
+
+
+def _percentile(values, percentile) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
+
+
+def _asset_id(mock_options, index=0) -> str:
+    return f"00000000-0000-4000-8001-{index % mock_options['assets_count']:012d}"
+
+
+def _album_id(index=0) -> str:
+    return f"00000000-0000-4000-8002-{index:012d}"
+
+
+def _upload_files(directory, count=20, size=64 * 1024) -> list:
+    upload_directory = os.path.join(directory, 'upload')
+    if not os.path.isdir(upload_directory):
+        os.makedirs(upload_directory)
+        for index in range(count):
+            with open(os.path.join(upload_directory, f'{index}.jpg'), 'wb') as file:
+                file.write(os.urandom(size))
+    return [os.path.join(upload_directory, file_name) for file_name in sorted(os.listdir(upload_directory))]
+
+
+def _hold_full_sync(client, typed_models: bool) -> list:
+    # The assets are returned, so that the peak memory of the call includes all of them at once
+    previous_typed_models, client.typed_models = client.typed_models, typed_models
+    try:
+        return list(client.asset.iter_full_sync(USER_ID, limit=250))
+    finally:
+        client.typed_models = previous_typed_models
+
+
+def benchmarks(mock_options) -> list:
+    asset_ids = [_asset_id(mock_options, index) for index in range(16)]
+    albums_names = [f"album {index}" for index in range(10)]
+    users_ids = [USER_ID] + [f"00000000-0000-4000-8000-{index:012d}" for index in range(1, 8)]
+
+    async def get_assets_info_async(client):
+        return await asyncio.gather(*(client.asset.get_asset_info_async(asset_id) for asset_id in asset_ids))
+
+    async def get_albums_async(client):
+        return await asyncio.gather(*(client.album.get_albums_async() for _ in range(16)))
+
+    return [
+        # User
+        Benchmark("user.get_my_user", lambda client, directory: client.user.get_my_user()),
+        Benchmark("user.get_user", lambda client, directory: client.user.get_user(USER_ID)),
+        Benchmark("user.get_users", lambda client, directory: client.user.get_users(users_ids)),
+        # Album
+        Benchmark("album.get_albums", lambda client, directory: client.album.get_albums()),
+        Benchmark("album.get_albums_async", lambda client, directory: asyncio.run(get_albums_async(client))),
+        Benchmark("album.get_album", lambda client, directory: client.album.get_album(_album_id())),
+        Benchmark("album.get_album_by_name", lambda client, directory: client.album.get_album_by_name("album 1")),
+        Benchmark("album.get_albums_by_names",
+                  lambda client, directory: client.album.get_albums_by_names(albums_names)),
+        Benchmark("album.create_album", lambda client, directory: client.album.create_album("created", [USER_ID])),
+        Benchmark("album.create_albums", lambda client, directory: client.album.create_albums(
+            {f"created {index}": [USER_ID] for index in range(10)})),
+        Benchmark("album.delete_album", lambda client, directory: client.album.delete_album(_album_id(1))),
+        Benchmark("album.bulk_add_assets_to_album",
+                  lambda client, directory: client.album.bulk_add_assets_to_album(_album_id(), asset_ids)),
+        # Asset
+        Benchmark("asset.get_random", lambda client, directory: client.asset.get_random(count=10)),
+        Benchmark("asset.get_all_user_assets_by_device_id",
+                  lambda client, directory: client.asset.get_all_user_assets_by_device_id("mock")),
+        Benchmark("asset.get_asset_info", lambda client, directory: client.asset.get_asset_info(asset_ids[0])),
+        Benchmark("asset.get_asset_info_async",
+                  lambda client, directory: asyncio.run(get_assets_info_async(client))),
+        Benchmark("asset.get_assets_info", lambda client, directory: client.asset.get_assets_info(asset_ids * 2)),
+        Benchmark("asset.get_full_sync_for_user",
+                  lambda client, directory: client.asset.get_full_sync_for_user(USER_ID, limit=250)),
+        Benchmark("asset.iter_full_sync",
+                  lambda client, directory: sum(1 for _ in client.asset.iter_full_sync(USER_ID, limit=250))),
+        Benchmark("asset.iter_full_sync_held", lambda client, directory: _hold_full_sync(client, False)),
+        Benchmark("asset.iter_full_sync_held_typed", lambda client, directory: _hold_full_sync(client, True)),
+        Benchmark("asset.get_delta_sync",
+                  lambda client, directory: client.asset.get_delta_sync([USER_ID], datetime(2024, 1, 20))),
+        Benchmark("asset.find_duplicates",
+                  lambda client, directory: client.asset.find_duplicates([USER_ID], near_duplicates=True)),
+        Benchmark("asset.view_asset", lambda client, directory: client.asset.view_asset(asset_ids[0])),
+        Benchmark("asset.get_asset_thumbnail",
+                  lambda client, directory: client.asset.get_asset_thumbnail(asset_ids[0], f'"{asset_ids[0]}"')),
+        Benchmark("asset.download_asset", lambda client, directory: client.asset.download_asset(asset_ids[0])),
+        Benchmark("asset.save_asset",
+                  lambda client, directory: client.asset.save_asset(asset_ids[0], os.path.join(directory, 'original'))),
+        Benchmark("asset.download_assets",
+                  lambda client, directory: client.asset.download_assets(
+                      asset_ids[:8], os.path.join(directory, 'download'), skip_existing=False), iterations=3),
+        Benchmark("asset.upload_assets",
+                  lambda client, directory: client.asset.upload_assets(_upload_files(directory)), iterations=3),
+        Benchmark("asset.delete_assets", lambda client, directory: client.asset.delete_assets(asset_ids)),
+        Benchmark("asset.run_asset_jobs",
+                  lambda client, directory: client.asset.run_asset_jobs(asset_ids, AssetJob.REFRESH_METADATA)),
+        # Job
+        Benchmark("job.get_all_jobs_status", lambda client, directory: client.job.get_all_jobs_status()),
+        Benchmark("job.get_job_status", lambda client, directory: client.job.get_job_status(JobName.LIBRARY)),
+        Benchmark("job.send_job_command", lambda client, directory: client.job.send_job_command(JobName.SIDECAR)),
+        Benchmark("job.wait_for_jobs", lambda client, directory: client.job.wait_for_jobs([JobName.LIBRARY])),
+        # Library
+        Benchmark("library.get_libraries", lambda client, directory: client.library.get_libraries()),
+        Benchmark("library.scan_library", lambda client, directory: client.library.scan_library(LIBRARY_ID)),
+        Benchmark("library.scan_libraries",
+                  lambda client, directory: client.library.scan_libraries([LIBRARY_ID], poll_interval=0.01)),
+    ]
+
+
+def _serve(connection, mock_options) -> None:
+    mock = MockImmich(**mock_options)
+    connection.send(mock.start())
+    # Serves until the benchmarks are done
+    connection.recv()
+    mock.stop()
+
+
+def run_benchmarks(mock_options: dict = None, iterations: int = 20, only: str = None, client_options: dict = None,
+                   progress_callback=None) -> list:
+    """
+    Runs the benchmarks against a mock server started in a child process, so that it is not measured
+
+    :param mock_options: the MockImmich parameters
+    :param iterations: the number of measured calls of each benchmark
+    :param only: only runs the benchmarks whose name contains this string
+    :param client_options: the PymmichClient parameters
+    :param progress_callback: called with the result of each benchmark
+    """
+    mock_options = {"assets_count": 1000, "albums_count": 20, "album_size": 50, "original_size": 1024 * 1024,
+                    "thumbnail_size": 16 * 1024, "latency": 0.0, **(mock_options or {})}
+
+    connection, child_connection = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(child_connection, mock_options), daemon=True)
+    server.start()
+    try:
+        url = connection.recv()
+        results = []
+        with PymmichClient(url, "benchmark", **(client_options or {})) as client, \
+                tempfile.TemporaryDirectory() as directory:
+            for benchmark in benchmarks(mock_options):
+                if only and only not in benchmark.name:
+                    continue
+                result = benchmark.run(client, directory, iterations)
+                results.append(result)
+                if progress_callback is not None:
+                    progress_callback(result)
+        return results
+    finally:
+        connection.send(None)
+        server.join(timeout=10)
+
+
+def format_result(result) -> str:
+    return (f"{result['name']:<40} {result['calls']:>5} {result['requests']:>8} {result['errors']:>6} "
+            f"{result['requests_per_second']:>10.1f} {result['p50'] * 1000:>9.2f} {result['p99'] * 1000:>9.2f} "
+            f"{result['bytes_per_second'] / 1024 / 1024:>10.2f} {result['peak_memory'] / 1024:>10.0f}")
+
+
+class BenchmarkPymmichClient(unittest.TestCase):
+    def test_benchmarks(self):
+        results = run_benchmarks({"assets_count": 300, "original_size": 64 * 1024}, iterations=2)
+        self.assertEqual(len(results), len(benchmarks({"assets_count": 300})))
+        for result in results:
+            self.assertEqual(result['errors'], 0, result['name'])
+            self.assertGreater(result['p50'], 0, result['name'])
+        self.assertGreater(sum(result['requests'] for result in results), 0)
+
+    def test_typed_models_memory(self):
+        results = {result['name']: result for result in
+                   run_benchmarks({"assets_count": 10000}, iterations=1, only="iter_full_sync_held")}
+        # The typed models keep the nested objects encoded, holding them takes a fraction of the raw dictionaries
+        self.assertLess(results['asset.iter_full_sync_held_typed']['peak_memory'] * 2,
+                        results['asset.iter_full_sync_held']['peak_memory'])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20, help='measured calls per benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='delay in seconds added to every response')
+    parser.add_argument('--assets', type=int, default=1000, help='number of assets of the mock server')
+    parser.add_argument('--original-size', type=int, default=1024 * 1024, help='size in bytes of the originals')
+    parser.add_argument('--thumbnail-size', type=int, default=16 * 1024, help='size in bytes of the thumbnails')
+    parser.add_argument('--only', help='only runs the benchmarks whose name contains this string')
+    parser.add_argument('--output', help='writes the results to this JSON file')
+    arguments = parser.parse_args()
+
+    print(f"{'benchmark':<40} {'calls':>5} {'requests':>8} {'errors':>6} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'MiB/s':>10} {'peak KiB':>10}")
+    results = run_benchmarks({"assets_count": arguments.assets, "original_size": arguments.original_size,
+                              "thumbnail_size": arguments.thumbnail_size, "latency": arguments.latency},
+                             arguments.iterations, arguments.only,
+                             progress_callback=lambda result: print(format_result(result), flush=True))
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    sys.exit(1 if any(result['errors'] for result in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+import base64
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from PIL import Image
+
+USER_ID = "00000000-0000-4000-8000-000000000000"
+LIBRARY_ID = "00000000-0000-4000-8000-100000000000"
+JOB_NAMES = ["thumbnailGeneration", "metadataExtraction", "videoConversion", "faceDetection", "facialRecognition",
+             "smartSearch", "backgroundTask", "storageTemplateMigration", "migration", "search", "sidecar", "library",
+             "notifications"]
+
+
+class MockImmich:
+    """Local stand-in of an Immich server, serving synthetic users, albums, assets, jobs and libraries"""
+
+    def __init__(self, assets_count: int = 1000, albums_count: int = 20, album_size: int = 50,
+                 original_size: int = 1024 * 1024, thumbnail_size: int = 16 * 1024, latency: float = 0.0) -> None:
+        """
+        Constructor
+
+        :param assets_count: the number of assets of the user
+        :param albums_count: the number of albums
+        :param album_size: the number of assets of each album
+        :param original_size: the size in bytes of every original, a small JPEG padded with comments
+        :param thumbnail_size: the size in bytes of every thumbnail
+        :param latency: the delay in seconds added to every response
+        """
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        self.original = _jpeg(original_size)
+        self.thumbnail = bytes(reversed(range(256))) * (thumbnail_size // 256) + bytes(thumbnail_size % 256)
+        checksum = base64.b64encode(hashlib.sha1(self.original).digest()).decode()
+
+        self.user = {"id": USER_ID, "name": "mock", "email": "mock@immich.local", "isAdmin": True,
+                     "profileImagePath": "", "avatarColor": "primary"}
+        self.assets = [{
+            "id": _uuid(1, index),
+            "deviceAssetId": f"{index}.jpg-{len(self.original)}",
+            "ownerId": USER_ID,
+            "deviceId": "mock",
+            "libraryId": LIBRARY_ID,
+            "type": "IMAGE",
+            "originalPath": f"/usr/src/app/external/{index}.jpg",
+            "originalFileName": f"{index}.jpg",
+            "resized": True,
+            "thumbhash": "1QcSHQRnh493V4dIh4eXh1h4kJUI",
+            "fileCreatedAt": _date(index),
+            "fileModifiedAt": _date(index),
+            "localDateTime": _date(index),
+            "updatedAt": _date(index),
+            "isFavorite": False,
+            "isArchived": False,
+            "isTrashed": False,
+            "isOffline": False,
+            "hasMetadata": True,
+            "duration": "0:00:00.00000",
+            "exifInfo": {"make": "Mock", "model": "Camera", "exifImageWidth": 4032, "exifImageHeight": 3024,
+                         "fileSizeInByte": len(self.original), "orientation": "1", "dateTimeOriginal": _date(index),
+                         "modifyDate": _date(index), "timeZone": "Europe/Paris", "lensModel": None, "fNumber": 1.8,
+                         "focalLength": 4.2, "iso": 100, "exposureTime": "1/120", "latitude": 48.8566,
+                         "longitude": 2.3522, "projectionType": None, "city": "Paris", "state": "Île-de-France",
+                         "country": "France", "description": "", "rating": None},
+            "livePhotoVideoId": None,
+            "people": [],
+            "checksum": checksum,
+            "duplicateId": None
+        } for index in range(assets_count)]
+        self.assets_by_id = {asset["id"]: asset for asset in self.assets}
+        self.albums = [{
+            "id": _uuid(2, index),
+            "albumName": f"album {index}",
+            "description": "",
+            "albumThumbnailAssetId": None,
+            "createdAt": _date(index),
+            "updatedAt": _date(index),
+            "ownerId": USER_ID,
+            "owner": self.user,
+            "albumUsers": [],
+            "shared": False,
+            "hasSharedLink": False,
+            "startDate": None,
+            "endDate": None,
+            "assetCount": min(album_size, assets_count),
+            "isActivityEnabled": True,
+            "order": "desc",
+            "assets": [self.assets[(index * album_size + offset) % assets_count]
+                       for offset in range(min(album_size, assets_count))] if assets_count else []
+        } for index in range(albums_count)]
+        self.albums_by_id = {album["id"]: album for album in self.albums}
+
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> str:
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-immich", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def full_sync(self, body) -> list:
+        index = 0
+        if body.get("lastId") is not None:
+            index = next((position + 1 for position, asset in enumerate(self.assets)
+                          if asset["id"] == body["lastId"]), len(self.assets))
+        return self.assets[index:index + body.get("limit", 100)]
+
+    def delta_sync(self, body) -> dict:
+        return {"needsFullSync": False, "deleted": [],
+                "upserted": [asset for asset in self.assets if asset["updatedAt"] >= body["updatedAfter"]]}
+
+    @staticmethod
+    def jobs() -> dict:
+        return {job_name: {"jobCounts": {"active": 0, "completed": 0, "failed": 0, "delayed": 0, "waiting": 0,
+                                         "paused": 0},
+                           "queueStatus": {"isActive": False, "isPaused": False}} for job_name in JOB_NAMES}
+
+    def libraries(self) -> list:
+        return [{"id": LIBRARY_ID, "name": "external", "ownerId": USER_ID, "type": "EXTERNAL",
+                 "assetCount": len(self.assets), "importPaths": ["/usr/src/app/external"], "exclusionPatterns": [],
+                 "createdAt": _date(0), "updatedAt": _date(0), "refreshedAt": _date(0)}]
+
+
+def _handler_for(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and small bodies are sent in a single segment, as a real server does
+        disable_nagle_algorithm = True
+        wbufsize = 64 * 1024
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            self._dispatch("GET")
+
+        def do_POST(self) -> None:
+            self._dispatch("POST")
+
+        def do_PUT(self) -> None:
+            self._dispatch("PUT")
+
+        def do_DELETE(self) -> None:
+            self._dispatch("DELETE")
+
+        def _dispatch(self, method) -> None:
+            mock.count_request()
+            if mock.latency:
+                time.sleep(mock.latency)
+
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+
+            for route_method, pattern, route in _ROUTES:
+                match = pattern.fullmatch(url.path)
+                if route_method == method and match:
+                    return route(self, mock, body, parse_qs(url.query), *match.groups())
+            self.send(404, {"message": f"Cannot {method} {url.path}"})
+
+        def send(self, status, payload=None, content=None, content_type="application/json", headers=None) -> None:
+            if content is None:
+                content = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(content)
+
+    return Handler
+
+
+def _get_album(handler, mock, body, query, album_id):
+    album = mock.albums_by_id.get(album_id)
+    handler.send(200, album) if album else handler.send(404, {"message": "Album not found"})
+
+
+def _get_albums(handler, mock, body, query):
+    albums = mock.albums
+    if "assetId" in query:
+        albums = [album for album in albums if any(asset["id"] == query["assetId"][0] for asset in album["assets"])]
+    handler.send(200, [{**album, "assets": []} for album in albums])
+
+
+def _create_album(handler, mock, body, query):
+    album = json.loads(body)
+    handler.send(201, {**mock.albums[0], "id": _uuid(2, 1000000 + mock.requests), "albumName": album["albumName"],
+                       "description": album.get("description", ""), "assetCount": 0, "assets": []}
+                 if mock.albums else {"id": _uuid(2, 1000000 + mock.requests), **album, "assets": []})
+
+
+def _add_assets_to_album(handler, mock, body, query, album_id):
+    handler.send(200, [{"id": asset_id, "success": True} for asset_id in json.loads(body)["ids"]])
+
+
+def _get_asset(handler, mock, body, query, asset_id):
+    asset = mock.assets_by_id.get(asset_id)
+    handler.send(200, asset) if asset else handler.send(404, {"message": "Asset not found"})
+
+
+def _get_device_assets(handler, mock, body, query, device_id):
+    handler.send(200, [asset["deviceAssetId"] for asset in mock.assets if asset["deviceId"] == device_id])
+
+
+def _get_random(handler, mock, body, query):
+    handler.send(200, mock.assets[:int(query.get("count", ["1"])[0])])
+
+
+def _get_original(handler, mock, body, query, asset_id):
+    content_range = handler.headers.get("Range")
+    if content_range:
+        start = int(content_range.split("=")[1].split("-")[0])
+        if start >= len(mock.original):
+            return handler.send(416, {"message": "Range not satisfiable"})
+        return handler.send(206, content=mock.original[start:], content_type="image/jpeg",
+                            headers={"Content-Range": f"bytes {start}-{len(mock.original) - 1}/{len(mock.original)}"})
+    handler.send(200, content=mock.original, content_type="image/jpeg")
+
+
+def _get_thumbnail(handler, mock, body, query, asset_id):
+    etag = f'"{asset_id}"'
+    if handler.headers.get("If-None-Match") == etag:
+        return handler.send(304, content=b"", headers={"ETag": etag})
+    handler.send(200, content=mock.thumbnail, content_type="image/webp", headers={"ETag": etag})
+
+
+def _bulk_upload_check(handler, mock, body, query):
+    checksums = {asset["checksum"] for asset in mock.assets}
+    handler.send(200, {"results": [
+        {"id": item["id"], "action": "reject", "reason": "duplicate", "assetId": mock.assets[0]["id"]}
+        if item["checksum"] in checksums else {"id": item["id"], "action": "accept"}
+        for item in json.loads(body)["assets"]]})
+
+
+_ROUTES = [
+    ("GET", re.compile(r"/api/users/me"), lambda handler, mock, body, query: handler.send(200, mock.user)),
+    ("GET", re.compile(r"/api/users/([^/]+)"),
+     lambda handler, mock, body, query, user_id: handler.send(200, {**mock.user, "id": user_id})),
+    ("GET", re.compile(r"/api/albums"), _get_albums),
+    ("POST", re.compile(r"/api/albums"), _create_album),
+    ("GET", re.compile(r"/api/albums/([^/]+)"), _get_album),
+    ("DELETE", re.compile(r"/api/albums/([^/]+)"), lambda handler, mock, body, query, album_id: handler.send(200)),
+    ("PUT", re.compile(r"/api/albums/([^/]+)/assets"), _add_assets_to_album),
+    ("POST", re.compile(r"/api/sync/full-sync"),
+     lambda handler, mock, body, query: handler.send(200, mock.full_sync(json.loads(body)))),
+    ("POST", re.compile(r"/api/sync/delta-sync"),
+     lambda handler, mock, body, query: handler.send(200, mock.delta_sync(json.loads(body)))),
+    ("GET", re.compile(r"/api/assets/random"), _get_random),
+    ("GET", re.compile(r"/api/assets/device/([^/]+)"), _get_device_assets),
+    ("POST", re.compile(r"/api/assets/bulk-upload-check"), _bulk_upload_check),
+    ("POST", re.compile(r"/api/assets/jobs"), lambda handler, mock, body, query: handler.send(204)),
+    ("POST", re.compile(r"/api/assets"),
+     lambda handler, mock, body, query: handler.send(201, {"id": _uuid(3, mock.requests), "status": "created"})),
+    ("DELETE", re.compile(r"/api/assets"), lambda handler, mock, body, query: handler.send(204)),
+    ("GET", re.compile(r"/api/assets/([^/]+)/original"), _get_original),
+    ("GET", re.compile(r"/api/assets/([^/]+)/thumbnail"), _get_thumbnail),
+    ("GET", re.compile(r"/api/assets/([^/]+)"), _get_asset),
+    ("GET", re.compile(r"/api/jobs"), lambda handler, mock, body, query: handler.send(200, mock.jobs())),
+    ("PUT", re.compile(r"/api/jobs/([^/]+)"),
+     lambda handler, mock, body, query, job_name: handler.send(200, mock.jobs().get(job_name, {}))),
+    ("GET", re.compile(r"/api/libraries"), lambda handler, mock, body, query: handler.send(200, mock.libraries())),
+    ("POST", re.compile(r"/api/libraries/([^/]+)/scan"),
+     lambda handler, mock, body, query, library_id: handler.send(204)),
+]
+
+
+def _jpeg(size) -> bytes:
+    # A real image, so that the originals can be decoded, padded up to the size with comment segments
+    buffer = io.BytesIO()
+    Image.linear_gradient("L").resize((64, 48)).convert("RGB").save(buffer, "JPEG", quality=75)
+    image = buffer.getvalue()
+
+    segments = []
+    padding = size - len(image)
+    while padding >= 4:
+        # A segment takes 4 bytes besides its data, a remainder too small for a segment is left out
+        length = min(padding - 2, 0xFFFF)
+        if 0 < padding - 2 - length < 4:
+            length -= 4
+        segments.append(b"\xff\xfe" + length.to_bytes(2, "big") + bytes(length - 2))
+        padding -= 2 + length
+    return image[:2] + b"".join(segments) + image[2:]
+
+
+def _uuid(kind, index) -> str:
+    return f"00000000-0000-4000-{8000 + kind:04d}-{index:012d}"
+
+
+def _date(index) -> str:
+    return f"2024-01-{1 + index % 28:02d}T{index // 28 % 24:02d}:00:00.000Z"
@@ -1,10 +1,22 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from pymmich.asset import LazyImage
+from pymmich.catalog import LocalCatalog
 from pymmich.client import PymmichClient
 from pymmich.enums.asset_job import AssetJob
 from pymmich.enums.job_name import JobName
+from pymmich.enums.job_wait_condition import JobWaitCondition
 from pymmich.enums.library_type import LibraryType
+from pymmich.models import Album, Asset
+from pymmich.thumbhash import decode_assets_thumbhashes, decode_thumbhash, decode_thumbhashes
+from pymmich.thumbnail_cache import ThumbnailCache
 
 BASE_URL = "https://immich.mydomain.com"
 API_KEY = "ABCDEFGHIJKLMNOPQRZTUVWXYZ0123456789"
@@ -110,6 +122,42 @@ class TestPymmichClient(unittest.TestCase):
         response = self.client.album.get_album_by_name(target_album_name=all_albums[0].get('albumName'))
         self.check_if_album_is_correct(response)
 
+    def test_get_albums_by_names(self):
+        all_albums = self.client.album.get_albums(asset_id=None, shared_album=None)
+        albums_names = [album.get('albumName') for album in all_albums[:5]]
+        response = self.client.album.get_albums_by_names(albums_names + ["UNKNOWN_album"])
+        self.assertIsNone(response.get("UNKNOWN_album"))
+        for album_name in albums_names:
+            self.check_if_album_is_correct(response.get(album_name))
+            self.assertEqual(response.get(album_name).get('albumName'), album_name)
+
+    def test_get_albums_by_names_refreshes_once(self):
+        user_test = self.client.user.get_my_user()
+        events = []
+        self.client.add_request_hook(events.append)
+        try:
+            # A missing name is only looked up by a single refresh, a created album is indexed without any refresh
+            self.client.album.get_albums_by_names(["UNKNOWN_album"])
+            self.client.album.get_albums_by_names(["UNKNOWN_album"])
+            self.assertTrue(self.client.album.create_album("TEST_album_indexed", [user_test.get('id')]))
+            test_album = self.client.album.get_album_by_name("TEST_album_indexed")
+        finally:
+            self.client.remove_request_hook(events.append)
+
+        self.assertEqual(test_album.get('albumName'), "TEST_album_indexed")
+        self.assertEqual([event.get('method') for event in events if event.get('endpoint') == '/api/albums'],
+                         ['GET', 'POST'])
+        self.client.album.delete_album(test_album.get('id'))
+
+    def test_get_albums_by_asset(self):
+        album_test = next(album for album in self.client.album.get_albums() if album.get('assetCount'))
+        asset_id = self.client.album.get_album(album_test.get('id')).get('assets')[0].get('id')
+
+        response = self.client.album.get_albums_by_asset(asset_id)
+        self.assertIn(album_test.get('id'), [album.get('id') for album in response])
+        self.assertCountEqual([album.get('id') for album in response],
+                              [album.get('id') for album in self.client.album.get_albums(asset_id=asset_id)])
+
     def test_actions_on_test_album(self):
         test_album_name = "TEST_album"
 
@@ -119,6 +167,13 @@ class TestPymmichClient(unittest.TestCase):
         test_album = self.client.album.get_album_by_name(target_album_name=test_album_name)
         self.assertTrue(response)
 
+        # create_albums
+        response = self.client.album.create_albums({"TEST_album_1": [user_test.get('id')],
+                                                    "TEST_album_2": [user_test.get('id')]})
+        self.assertEqual(response, {"TEST_album_1": True, "TEST_album_2": True})
+        for album_name in response:
+            self.client.album.delete_album(self.client.album.get_album_by_name(album_name).get('id'))
+
         # add_assets_to_album
         random_asset = self.client.asset.get_random()
         response = self.client.album.add_assets_to_album(test_album.get('id'), [random_asset[0].get('id')])
@@ -127,6 +182,14 @@ class TestPymmichClient(unittest.TestCase):
         assert any(album.get('albumName') == 'TEST_album' for album in
                    assets_album), "No album with 'albumName' == 'TEST_album' found"
 
+        # bulk_add_assets_to_album
+        random_assets = self.client.asset.get_random(count=5)
+        random_assets_ids = [asset.get('id') for asset in random_assets]
+        response = self.client.album.bulk_add_assets_to_album(test_album.get('id'), random_assets_ids, batch_size=2)
+        self.assertEqual(set(response.keys()), {asset.get('id') for asset in random_assets})
+        for result in response.values():
+            self.assertTrue(result.get('success') or result.get('error') == 'duplicate')
+
         # delete_album
         response = self.client.album.delete_album(test_album.get('id'))
         self.assertTrue(response)
@@ -157,27 +220,148 @@ class TestPymmichClient(unittest.TestCase):
         for asset in response:
             self.check_if_asset_is_correct(asset)
 
+    def test_iter_full_sync(self):
+        client_id = self.client.user.get_my_user().get('id')
+        first_page = self.client.asset.get_full_sync_for_user(user_id=client_id, limit=5)
+        response = self.client.asset.iter_full_sync(user_id=client_id, limit=2)
+
+        for expected_asset, asset in zip(first_page, response):
+            self.check_if_asset_is_correct(asset)
+            self.assertEqual(asset.get('id'), expected_asset.get('id'))
+
+    def test_get_delta_sync(self):
+        client_id = self.client.user.get_my_user().get('id')
+        response = self.client.asset.get_delta_sync([client_id], datetime(2024, 1, 1, 1, 23, 45))
+        self.assertTrue({'needsFullSync', 'upserted', 'deleted'}.issubset(response.keys()))
+        for asset in response.get('upserted'):
+            self.check_if_asset_is_correct(asset)
+
+    def test_local_catalog(self):
+        me = self.client.user.get_my_user()
+        with LocalCatalog(self.client) as catalog:
+            response = catalog.refresh()
+            self.assertTrue(response[me.get('id')]['full'])
+            self.assertIsNotNone(catalog.get_sync_state(me.get('id')))
+
+            response = catalog.refresh()
+            self.assertFalse(response[me.get('id')]['full'])
+
+            for asset in catalog.get_assets_without_album(owner_id=me.get('id')):
+                self.check_if_asset_is_correct(asset)
+                self.assertEqual(self.client.album.get_albums(asset_id=asset.get('id')), [])
+
+            for asset in catalog.get_assets_updated_since(datetime(2024, 1, 31, 12, 34, 56)):
+                self.assertGreater(datetime.fromisoformat(asset.get('updatedAt')),
+                                   datetime.fromisoformat('2024-01-31T12:34:56.000+00:00'))
+
     def test_get_asset_info(self):
         random_asset = self.client.asset.get_random()
         response = self.client.asset.get_asset_info(random_asset[0].get('id'))
         self.check_if_asset_is_correct(response)
 
+    def test_get_assets_info(self):
+        random_assets = self.client.asset.get_random(count=5)
+        assets_ids = [random_asset.get('id') for random_asset in random_assets]
+        response = self.client.asset.get_assets_info(assets_ids + assets_ids)
+        self.assertEqual(set(response), set(assets_ids))
+        for asset_info in response.values():
+            self.check_if_asset_is_correct(asset_info)
+
+        streamed_ids = [asset_id for asset_id, asset_info in self.client.asset.iter_assets_info(assets_ids)]
+        self.assertCountEqual(streamed_ids, set(assets_ids))
+
     def test_download_asset(self):
         random_asset = self.client.asset.get_random()
         response = self.client.asset.download_asset(random_asset[0].get('id'))
         self.assertIsNotNone(response, "the response must be neither None nor False")
 
-    def test_upload_and_delete_assets(self):  # TODO
-        # upload
-        pass
+    def test_download_asset_lazy(self):
+        random_asset = self.client.asset.get_random()
+        with self.client.asset.download_asset(random_asset[0].get('id'), lazy=True, draft_size=(160, 160)) as response:
+            self.assertIsInstance(response, LazyImage)
+            self.assertIsNotNone(response.format)
+            image = response.load()
+            self.assertTrue(all(dimension > 0 for dimension in image.size))
+
+    def test_save_asset(self):
+        random_asset = self.client.asset.get_random()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, random_asset[0].get('originalFileName'))
+            response = self.client.asset.save_asset(random_asset[0].get('id'), path, verify_checksum=True,
+                                                    checksum=random_asset[0].get('checksum'))
+            self.assertTrue(response)
+            self.assertTrue(os.path.isfile(path))
+
+    def test_download_assets(self):
+        random_assets = self.client.asset.get_random(count=3)
+        with tempfile.TemporaryDirectory() as directory:
+            response = self.client.asset.download_assets([asset.get('id') for asset in random_assets], directory)
+            self.assertEqual(len(response.get('downloaded')), len({asset.get('id') for asset in random_assets}))
+            self.assertFalse(response.get('failed'))
+
+            response = self.client.asset.download_assets(random_assets, directory)
+            self.assertEqual(len(response.get('skipped')), len(random_assets))
+
+    def test_upload_and_delete_assets(self):
+        random_asset = self.client.asset.get_random()[0]
+        with tempfile.TemporaryDirectory() as directory:
+            # upload
+            path = os.path.join(directory, random_asset.get('originalFileName'))
+            self.assertTrue(self.client.asset.save_asset(random_asset.get('id'), path))
+            response = self.client.asset.upload_assets([path])
+            self.assertEqual(response.get('duplicates'), [path])
+            self.assertEqual(response.get('assets').get(path), random_asset.get('id'))
+
+            with open(path, 'ab') as file:
+                file.write(os.urandom(16))
+            response = self.client.asset.upload_assets([path])
+            self.assertEqual(response.get('uploaded'), [path])
+            uploaded_asset_id = response.get('assets').get(path)
+
+            response = self.client.asset.upload_assets([path])
+            self.assertEqual(response.get('duplicates'), [path])
+
         # delete
-        pass
+        response = self.client.asset.delete_assets([uploaded_asset_id])
+        self.assertTrue(response)
+
+    def test_find_duplicates(self):
+        my_user = self.client.user.get_my_user()
+        response = self.client.asset.find_duplicates([my_user.get('id')], near_duplicates=True)
+        self.assertGreater(response.get('assets'), 0)
+        for group in response.get('duplicates'):
+            self.assertGreater(len(group.get('assets_ids')), 1)
+        for group in response.get('near_duplicates'):
+            self.assertTrue(all(distance <= 0.05 for distance in group.get('distances').values()))
 
     def test_view_asset(self):
         random_asset = self.client.asset.get_random()
         response = self.client.asset.view_asset(random_asset[0].get('id'))
         self.assertIsNotNone(response)
 
+    def test_thumbnail_cache(self):
+        random_assets = self.client.asset.get_random(count=3)
+        with tempfile.TemporaryDirectory() as directory:
+            thumbnail_cache = ThumbnailCache(self.client, directory)
+            response = thumbnail_cache.prefetch(random_assets)
+            self.assertTrue(all(response.values()))
+
+            for asset in random_assets:
+                response = thumbnail_cache.get(asset.get('id'), asset.get('thumbhash'))
+                self.assertEqual(response, self.client.asset.view_asset(asset.get('id')))
+            self.assertEqual(thumbnail_cache.stats().get('hits'), len(random_assets))
+
+    def test_decode_thumbhashes(self):
+        random_assets = [asset for asset in self.client.asset.get_random(count=10) if asset.get('thumbhash')]
+        response = decode_assets_thumbhashes(random_assets)
+        self.assertEqual(len(response), len(random_assets))
+        for asset in random_assets:
+            self.assertEqual(response[asset.get('id')].shape[2], 4)
+            self.assertTrue((response[asset.get('id')] == decode_thumbhash(asset.get('thumbhash'))).all())
+
+        response = decode_thumbhashes([asset.get('thumbhash') for asset in random_assets], size=(16, 16))
+        self.assertEqual(response.shape, (len(random_assets), 16, 16, 4))
+
     def test_run_asset_jobs(self):
         random_asset = self.client.asset.get_random()
         response = self.client.asset.run_asset_jobs([random_asset[0].get('id')], AssetJob.REFRESH_METADATA)
@@ -199,6 +383,16 @@ class TestPymmichClient(unittest.TestCase):
         response = self.client.job.get_job_status(JobName.SIDECAR)
         self.check_if_job_is_correct(response)
 
+    def test_wait_for_jobs(self):
+        self.client.job.send_job_command(JobName.SIDECAR)
+        progress = []
+        response = self.client.job.wait_for_jobs([JobName.SIDECAR], timeout=600, progress_callback=progress.append)
+        self.check_if_job_is_correct(response[JobName.SIDECAR])
+        self.assertEqual(progress[-1]['pending'], 0)
+
+        response = asyncio.run(self.client.job.wait_for_jobs_async([JobName.SIDECAR], until=JobWaitCondition.IDLE))
+        self.check_if_job_is_correct(response[JobName.SIDECAR])
+
     ###################################################################################################################
     # Library
     ###################################################################################################################
@@ -222,6 +416,14 @@ class TestPymmichClient(unittest.TestCase):
         response = self.client.library.scan_library(library.get('id'))
         self.assertTrue(response)
 
+    def test_scan_libraries(self):
+        libraries = self.client.library.get_libraries(library_type=LibraryType.EXTERNAL)
+        response = self.client.library.scan_libraries(max_concurrent=2, timeout=3600)
+        self.assertEqual(set(response), {library.get('id') for library in libraries})
+        for result in response.values():
+            self.assertTrue(result['success'])
+            self.assertGreaterEqual(result['duration'], 0)
+
     ###################################################################################################################
     # USER
     ###################################################################################################################
@@ -250,6 +452,135 @@ class TestPymmichClient(unittest.TestCase):
         response = self.client.user.get_user_by_id(user_test.get('id'))
         self.assertTrue(expected_keys.issubset(response.keys()))
 
+    def test_cached_get_user(self):
+        client = PymmichClient(base_url=BASE_URL, api_key=API_KEY, cache=True)
+        user_test = client.user.get_my_user()
+        for _ in range(3):
+            response = client.user.get_user(user_test.get('id'))
+            self.assertEqual(response.get('id'), user_test.get('id'))
+        self.assertEqual(client.cache.stats().get('hits'), 2)
+        self.assertEqual(client.cache.stats().get('misses'), 2)
+
+        # Every hit is a copy, modifying it leaves the cached response untouched
+        response['name'] = 'MODIFIED'
+        self.assertEqual(client.user.get_user(user_test.get('id')).get('name'), user_test.get('name'))
+
+    def test_get_users(self):
+        user_test = self.client.user.get_my_user()
+        response = self.client.user.get_users([user_test.get('id'), user_test.get('id')])
+        self.assertEqual(list(response.keys()), [user_test.get('id')])
+        self.assertEqual(response.get(user_test.get('id')).get('name'), user_test.get('name'))
+
+    def test_typed_models(self):
+        client = PymmichClient(base_url=BASE_URL, api_key=API_KEY, typed_models=True)
+        random_asset = client.asset.get_random()[0]
+        self.assertIsInstance(random_asset, Asset)
+        self.check_if_asset_is_correct(random_asset)
+        self.assertEqual(random_asset.id, random_asset.get('id'))
+        self.assertEqual(random_asset.original_file_name, random_asset.get('originalFileName'))
+        if random_asset.thumbhash:
+            self.assertEqual(random_asset.thumbhash_image().mode, 'RGBA')
+
+        for album in client.album.get_albums(asset_id=None, shared_album=True):
+            self.assertIsInstance(album, Album)
+            self.check_if_album_is_correct(dict(album))
+            self.assertTrue(all(isinstance(asset, Asset) for asset in album.assets))
+
+    def test_request_hooks(self):
+        events = []
+        self.client.add_request_hook(events.append)
+        user_test = self.client.user.get_my_user()
+        self.client.user.get_user(user_test.get('id'))
+        self.client.remove_request_hook(events.append)
+
+        self.assertEqual([event.get('endpoint') for event in events], ['/api/users/me', '/api/users/{id}'])
+        for event in events:
+            self.assertEqual(event.get('status'), 200)
+            self.assertGreater(event.get('bytes_in'), 0)
+
+    def test_metrics(self):
+        client = PymmichClient(base_url=BASE_URL, api_key=API_KEY, metrics=True, cache=True)
+        client.user.get_my_user()
+        client.user.get_my_user()
+
+        snapshot = client.metrics.snapshot()
+        self.assertEqual(snapshot['requests'][0]['endpoint'], '/api/users/me')
+        self.assertEqual(snapshot['requests'][0]['count'], 1)
+        self.assertEqual(snapshot['cache']['hits'], 1)
+        self.assertEqual(snapshot['in_flight'], 0)
+        self.assertIn('pymmich_request_duration_seconds_count{method="GET",endpoint="/api/users/me",status="200"} 1',
+                      client.metrics.to_prometheus())
+
+    def test_rate_limited_client(self):
+        client = PymmichClient(base_url=BASE_URL, api_key=API_KEY, rate_limit=5, rate_limit_burst=1)
+        started_at = time.monotonic()
+        for _ in range(5):
+            self.assertIsNotNone(client.user.get_my_user())
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.8)
+
+    def test_get_user_async(self):
+        user_test = self.client.user.get_my_user()
+
+        async def get_users():
+            return await asyncio.gather(*(self.client.user.get_user_async(user_test.get('id')) for _ in range(5)))
+
+        for response in asyncio.run(get_users()):
+            self.assertEqual(response.get('id'), user_test.get('id'))
+
+    def block_requests(self):
+        # The requests actually sent wait for the release, so that the concurrent calls are sure to overlap
+        session = self.client.session
+        send_request = session._send_request
+        release = threading.Event()
+        sent = []
+
+        def blocked_send_request(method, url, *args, **kwargs):
+            sent.append(url)
+            release.wait(10)
+            return send_request(method, url, *args, **kwargs)
+
+        session._send_request = blocked_send_request
+        return release, sent
+
+    @staticmethod
+    def wait_until(condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_single_flight(self):
+        single_flight = self.client.session.single_flight
+        coalesced = single_flight.coalesced
+        release, sent = self.block_requests()
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(self.client.album.get_albums) for _ in range(10)]
+            self.wait_until(lambda: single_flight.coalesced - coalesced == 9)
+            release.set()
+            responses = [future.result() for future in futures]
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(single_flight.coalesced - coalesced, 9)
+        for response in responses:
+            self.assertEqual(response, responses[0])
+
+    def test_single_flight_skips_streams_and_bodies(self):
+        release, sent = self.block_requests()
+        url = f"{BASE_URL}/api/users/me"
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(self.client.session.get, url, **self.client.requests_kwargs, stream=True)
+                       for _ in range(5)]
+            futures += [executor.submit(self.client.session.get, url, **self.client.requests_kwargs, data='{}')
+                        for _ in range(5)]
+            self.wait_until(lambda: len(sent) == 10)
+            release.set()
+            for future in futures:
+                future.result().close()
+
+        self.assertEqual(len(sent), 10)
+        self.assertEqual(self.client.session.single_flight.coalesced, 0)
+
 
 if __name__ == '__main__':
     unittest.main()